@@ -1,4 +1,5 @@
 const API_BASE = process.env.NEXT_PUBLIC_API_URL;
+const INGEST_POLL_MS = 1000;
 
 async function handleResponse(res: Response) {
   let data: any;
@@ -25,7 +26,20 @@ export async function ingestFile(file: File) {
     body: form,
   });
 
-  return handleResponse(res);
+  // Ingestion runs in the background; poll the job until it finishes
+  let job = await handleResponse(res);
+  while (job.status === "queued" || job.status === "running") {
+    await new Promise((resolve) => setTimeout(resolve, INGEST_POLL_MS));
+    job = await handleResponse(
+      await fetch(`${API_BASE}/ingest/jobs/${job.job_id}`)
+    );
+  }
+
+  if (job.status === "failed") {
+    throw new Error(job.error || "Ingestion failed");
+  }
+
+  return job.result;
 }
 
 export async function startDraft(query: string) {
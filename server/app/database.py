@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from sqlalchemy.exc import SQLAlchemyError
 import os
@@ -8,12 +10,96 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./legal_auto.db")
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Async drivers for the request path; the sync engine stays for startup,
+# migrations and CLI scripts
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _is_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url) -> bool:
+    return _is_sqlite(url) and url.database in (None, "", ":memory:")
+
+
+def async_database_url(url: str) -> str:
+    explicit = os.getenv("DATABASE_ASYNC_URL")
+    if explicit:
+        return explicit
+
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise RuntimeError(
+            f"No async driver for {parsed.get_backend_name()}; set DATABASE_ASYNC_URL"
+        )
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _engine_options(url) -> dict:
+    if _is_memory_sqlite(url):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": not _is_sqlite(url),
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers proceed while a writer commits; NORMAL sync is safe
+    under WAL and skips an fsync per commit; mmap serves reads from the
+    page cache without copying.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _configure(sync_engine, url):
+    if _is_sqlite(url) and not _is_memory_sqlite(url):
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+
+
+_url = make_url(SQLALCHEMY_DATABASE_URL)
+
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False} if _is_sqlite(_url) else {},
+    **_engine_options(_url),
 )
+_configure(engine, _url)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    async_database_url(SQLALCHEMY_DATABASE_URL), **_engine_options(_url)
+)
+_configure(async_engine.sync_engine, _url)
+
+# Objects stay usable after commit, since re-loading expired attributes
+# would need an await in code that reads them afterwards
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 def check_db():
     try:
@@ -26,5 +112,5 @@ def check_db():
         return False
 
 
-class Base(DeclarativeBase):
+class Base(AsyncAttrs, DeclarativeBase):
     pass
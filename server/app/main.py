@@ -7,26 +7,31 @@ from fastapi import (
     HTTPException,
     Request,
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import Dict, List, Literal, Optional
 
-from .database import engine, SessionLocal, Base, check_db
-from .models import Template
+from .database import engine, async_engine, AsyncSessionLocal, SessionLocal, Base, check_db
+from .models import IngestJob, Template
 
-from .services.web_search import search_template_on_web
-from .services.parser import extract_text_from_file
-from .services.gemini import analyze_document
+from .services.web_search import close_http_client
+from .services.bootstrap import BootstrapError, bootstrap_template
+from .services.parser import shutdown_process_pool
+from .services.ingest import INGEST_MAX_FILES, IngestError, ingest_many
+from .services.jobs import enqueue_upload, ingest_workers, job_status
 from .services.chat import (
-    extract_template_from_web,
-    generate_friendly_questions,
     find_best_template,
-    prefill_variables_from_query,
-    create_template,
+    load_questions,
+    prefill_and_load_questions,
 )
+from .services.draft import draft_payload, needs_bootstrap, stream_draft
+from .services.index import template_index
+from .services.render import load_compiled, render_compiled, stream_rendered
+from .services.cache import CACHE_REGISTRY
 from .seed_templates import seed_templates
+from .migrate import add_missing_columns
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(title="Legal Doc AI")
@@ -52,27 +57,43 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 @app.on_event("startup")
 def startup_event():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
 
     check_db()
     db = SessionLocal()
     try:
-        # seed_templates(db)
-        pass
+        # Seed templates with `python -m app.seed_templates`; seeding is async
+        # and can't run from this sync startup hook
+        template_index.load(db)
     finally:
         db.close()
 
 
+@app.on_event("startup")
+async def start_ingest_workers():
+    ingest_workers.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await ingest_workers.stop()
+    template_index.flush()
+    shutdown_process_pool()
+    await close_http_client()
+    await async_engine.dispose()
+
+
+PdfEngine = Literal["auto", "pdfium", "pdfplumber"]
+
+
 class DraftRequest(BaseModel):
     query: str
 
@@ -83,29 +104,53 @@ class SubmitAnswersRequest(BaseModel):
     prefilled: Optional[Dict[str, str]] = None
 
 
-@app.post("/ingest")
-async def ingest_document(file: UploadFile = File(...), db: Session = Depends(get_db)):
-
-    # 1 Extract Text
+@app.post("/ingest", status_code=202)
+async def ingest_document(
+    file: UploadFile = File(...),
+    pdf_engine: Optional[PdfEngine] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Queue an upload; poll status_url for the outcome."""
     try:
-        raw_text = await extract_text_from_file(file)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail="Failed to extract text from file")
+        job = await enqueue_upload(file, db, pdf_engine=pdf_engine)
+    except IngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-    # 2 AI Analysis
-    try:
-        analysis = await analyze_document(raw_text)
-    except Exception:
-        raise HTTPException(status_code=500, detail="Document analysis failed")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/ingest/jobs/{job.id}",
+    }
 
-    new_template = create_template(
-        title=file.filename, raw_text=raw_text, analysis=analysis, db=db
-    )
+
+@app.get("/ingest/jobs/{job_id}")
+async def ingest_job_status(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(IngestJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+
+    return job_status(job)
+
+
+@app.post("/ingest/batch")
+async def ingest_batch(
+    files: List[UploadFile] = File(...),
+    pdf_engine: Optional[PdfEngine] = None,
+):
+    if len(files) > INGEST_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files: at most {INGEST_MAX_FILES} per batch",
+        )
+
+    results = await ingest_many(files, pdf_engine)
+    succeeded = sum(1 for r in results if r["status"] == "success")
 
     return {
-        "status": "success",
-        "template_id": new_template.id,
-        "detected_variables": len(analysis.get("variables", [])),
+        "status": "success" if succeeded == len(results) else "partial",
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
     }
 
 
@@ -114,89 +159,71 @@ async def health():
     return {"message": "Working..."}
 
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "caches": {name: cache.stats() for name, cache in CACHE_REGISTRY.items()},
+    }
+
+
 @app.post("/start-draft")
-async def start_draft(request: DraftRequest, db: Session = Depends(get_db)):
+async def start_draft(request: DraftRequest, db: AsyncSession = Depends(get_db)):
 
     query = request.query
-    templates = db.query(Template).all()
+    await template_index.ensure_loaded_async()
 
     try:
-        result = await find_best_template(query, templates)
+        result = await find_best_template(query, template_index)
     except Exception as e:
         print("error", e)
         raise HTTPException(500, "Template matching failed")
 
     is_new_template = False
 
-    if result.best_template_id is None or result.confidence < 0.6:
-        web_result = await search_template_on_web(result.title)
-        if not web_result:
-            raise HTTPException(404, "No template found on web")
-
-        extracted = extract_template_from_web(
-            web_result["title"], web_result["raw_text"]
-        )
+    if needs_bootstrap(result):
+        try:
+            template_id, prefilled_answers = await bootstrap_template(
+                result.title, query
+            )
+        except BootstrapError as e:
+            raise HTTPException(e.status_code, e.detail)
 
-        if not extracted:
-            raise HTTPException(500, "LLM failed to extract template")
-
-        new_template = create_template(
-            title=result.title,
-            raw_text=extracted["body"],
-            analysis={
-                "variables": extracted["variables"],
-                "similarity_tags": extracted.get("similarity_tags", []),
-            },
-            db=db,
-        )
+        template = await db.get(Template, template_id)
+        # The precompute at insert is best-effort, so this may still generate
+        questions = await load_questions(template, db)
         is_new_template = True
-        template = db.query(Template).get(new_template.id)
     else:
-        template = db.query(Template).get(result.best_template_id)
-
-    if not template:
-        raise HTTPException(404, "Template not found")
-
-    prefilled_answers = prefill_variables_from_query(
-        user_query=query,
-        variables=template.variables,
-    )
+        template = await db.get(Template, result.best_template_id)
 
-    missing_vars = []
+        if not template:
+            raise HTTPException(404, "Template not found")
 
-    for v in template.variables:
-        if v["key"] not in prefilled_answers:
-            missing_vars.append(v)
+        prefilled_answers, questions = await prefill_and_load_questions(
+            query, template, db
+        )
 
     confidence = None if is_new_template else result.confidence
     reason = None if is_new_template else result.reason
 
-    if missing_vars:
-        questions = await generate_friendly_questions(missing_vars)
+    return draft_payload(template, prefilled_answers, questions, confidence, reason)
 
-        return {
-            "template_id": template.id,
-            "template_title": template.title,
-            "prefilled": prefilled_answers,
-            "questions": questions,
-            "missing_keys": list(questions.keys()),
-        }
-
-    return {
-        "template_id": template.id,
-        "confidence": confidence,
-        "reason": reason,
-        "template_title": template.title,
-    }
 
+@app.post("/start-draft/stream")
+async def start_draft_stream(request: DraftRequest):
+    """
+    Same flow as /start-draft as Server-Sent Events, so clients can show
+    the matched template, prefilled values and each question as soon as
+    they are ready. The final "done" event carries the /start-draft body.
+    """
+    return StreamingResponse(
+        stream_draft(request.query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@app.post("/finish-draft")
-async def submit_answers(
-    payload: SubmitAnswersRequest,
-    db: Session = Depends(get_db),
-):
 
-    template = db.query(Template).get(payload.template_id)
+async def load_answers_for_render(payload: SubmitAnswersRequest, db: AsyncSession):
+    template = await db.get(Template, payload.template_id)
 
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
@@ -215,14 +242,49 @@ async def submit_answers(
                 detail=f"Missing required field: {var.get('label', key)}",
             )
 
-    # Render markdown
-    final_doc = template.body
-    for key, value in final_answers.items():
-        final_doc = final_doc.replace(f"{{{{{key}}}}}", value)
+    return template, final_answers
+
+
+@app.post("/finish-draft")
+async def submit_answers(
+    payload: SubmitAnswersRequest,
+    db: AsyncSession = Depends(get_db),
+):
+
+    template, final_answers = await load_answers_for_render(payload, db)
+
+    rendered = render_compiled(await load_compiled(template), final_answers)
 
     return {
         "status": "success",
         "template_id": template.id,
-        "output": final_doc,
+        "output": rendered.output,
         "filled_variables": final_answers,
+        "unknown_variables": rendered.unknown,
+        "unfilled_variables": rendered.unfilled,
     }
+
+
+@app.post("/finish-draft/stream")
+async def stream_answers(
+    payload: SubmitAnswersRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Same rendering as /finish-draft, streamed as chunked text/markdown
+    straight from the compiled template instead of one JSON string.
+    """
+
+    template, final_answers = await load_answers_for_render(payload, db)
+
+    compiled = await load_compiled(template)
+    unfilled = sorted(k for k in compiled.placeholders if k not in final_answers)
+
+    return StreamingResponse(
+        stream_rendered(compiled, final_answers),
+        media_type="text/markdown; charset=utf-8",
+        headers={
+            "X-Template-Id": str(template.id),
+            "X-Unfilled-Variables": ",".join(unfilled),
+        },
+    )
@@ -0,0 +1,125 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from app.database import Base, SessionLocal, engine
+from app.models import is_packed_embedding, pack_embedding, unpack_embedding
+
+
+BATCH_SIZE = 500
+
+
+def add_missing_columns():
+    """
+    create_all() only creates missing tables; add nullable columns that were
+    introduced after a table was first created, and their indexes.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(
+                        f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'
+                    )
+                )
+                print(f"Added column {table.name}.{column.name}")
+
+            existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    print(f"Added index {index.name}")
+
+
+def _widen_embedding_column(db: Session):
+    """
+    Postgres stores JSON and BYTEA in different column types, so the JSON
+    text is carried over as UTF-8 bytes first. SQLite keeps any value in any
+    column, so no DDL is needed there.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    columns = {c["name"]: c for c in inspect(engine).get_columns("templates")}
+    if columns["embedding"]["type"].__class__.__name__ == "BYTEA":
+        return
+
+    db.execute(
+        text(
+            "ALTER TABLE templates ALTER COLUMN embedding TYPE BYTEA "
+            "USING convert_to(embedding::text, 'UTF8')"
+        )
+    )
+
+
+def migrate_embeddings(db: Session) -> int:
+    _widen_embedding_column(db)
+
+    converted = 0
+    last_id = 0
+
+    while True:
+        rows = db.execute(
+            text(
+                "SELECT id, embedding FROM templates "
+                "WHERE id > :last_id AND embedding IS NOT NULL "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            if is_packed_embedding(row.embedding):
+                continue
+
+            vector = unpack_embedding(row.embedding)
+            updates.append(
+                {
+                    "id": row.id,
+                    "embedding": None if vector is None else pack_embedding(vector),
+                }
+            )
+
+        if updates:
+            db.execute(
+                text("UPDATE templates SET embedding = :embedding WHERE id = :id"),
+                updates,
+            )
+            converted += len(updates)
+
+        last_id = rows[-1].id
+
+    db.commit()
+    return converted
+
+
+def run():
+    add_missing_columns()
+
+    db = SessionLocal()
+    try:
+        converted = migrate_embeddings(db)
+        print(f"✅ Migrated {converted} embeddings to packed storage")
+    except Exception as e:
+        db.rollback()
+        print("Embedding migration failed:", e)
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -1,15 +1,151 @@
-from sqlalchemy import Text, JSON, String
+import json
+import os
+import numpy as np
+from typing import Optional
+from sqlalchemy import Text, JSON, String, LargeBinary, Integer, DateTime, func
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from .database import Base
 
 
+EMBEDDING_DTYPE = np.dtype(os.getenv("EMBEDDING_DTYPE", "float32"))
+
+# 4-byte header so blobs stay decodable if EMBEDDING_DTYPE changes later,
+# and the payload after it stays 4-byte aligned for zero-copy views.
+_HEADERS = {
+    np.dtype(np.float32): b"EVf4",
+    np.dtype(np.float16): b"EVf2",
+}
+_DTYPES = {header: dtype for dtype, header in _HEADERS.items()}
+
+if EMBEDDING_DTYPE not in _HEADERS:
+    raise RuntimeError("EMBEDDING_DTYPE must be float32 or float16")
+
+
+def pack_embedding(values, dtype: np.dtype = EMBEDDING_DTYPE) -> bytes:
+    array = np.asarray(values, dtype=dtype)
+    return _HEADERS[array.dtype] + array.tobytes()
+
+
+def is_packed_embedding(value) -> bool:
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:4]) in _DTYPES
+
+
+def unpack_embedding(value) -> np.ndarray | None:
+    """
+    Decode a stored embedding into a read-only NumPy view over the blob.
+    Legacy JSON values (rows not yet migrated) are parsed as a fallback;
+    a JSON null decodes to None.
+    """
+    if is_packed_embedding(value):
+        dtype = _DTYPES[bytes(value[:4])]
+        return np.frombuffer(value, dtype=dtype, offset=4)
+
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, (bytes, str)):
+        value = json.loads(value)
+    if value is None:
+        return None
+
+    return np.asarray(value, dtype=np.float32)
+
+
+class PackedEmbedding(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return pack_embedding(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return unpack_embedding(value)
+
+    def result_processor(self, dialect, coltype):
+        # Skip LargeBinary's bytes() coercion: it would copy the blob and
+        # reject legacy JSON values that unpack_embedding still accepts.
+        def process(value):
+            return self.process_result_value(value, dialect)
+
+        return process
+
+
 class Template(Base):
 
     __tablename__ = "templates"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String)
-    body: Mapped[str] = mapped_column(Text)
+    # Only rendering and maintenance read the body, so it is loaded on first
+    # access instead of with every row
+    body: Mapped[str] = mapped_column(Text, deferred=True)
     variables: Mapped[list] = mapped_column(JSON, default=list)
     tags: Mapped[list] = mapped_column(JSON, default=list)
-    embedding = mapped_column(JSON, nullable=True)
+    embedding = mapped_column(PackedEmbedding, nullable=True)
+    # Fingerprint of the model and text the embedding was computed from;
+    # re-indexing skips rows where it still matches
+    embedding_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    # Friendly question per variable key, valid while questions_hash matches
+    # the fingerprint of the current variable specs
+    questions: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    questions_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    # Bumped whenever body changes; keys caches of derived data such as the
+    # compiled renderer
+    version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, default=1)
+    # Normalized title of a template bootstrapped from the web; unique so
+    # concurrent bootstraps of the same document type on several workers
+    # converge on one row. NULL for uploaded and seeded templates.
+    bootstrap_key: Mapped[Optional[str]] = mapped_column(
+        String(255), nullable=True, unique=True, index=True
+    )
+
+
+class IngestRecord(Base):
+    """
+    Content-addressed record of an ingested upload: the SHA-256 of the raw
+    bytes and of the normalized extracted text, with the analysis and the
+    template they produced.
+    """
+
+    __tablename__ = "ingest_records"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    raw_sha256: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    text_sha256: Mapped[str] = mapped_column(String(64), index=True)
+    analysis: Mapped[dict] = mapped_column(JSON)
+    template_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    created_at = mapped_column(DateTime, server_default=func.now())
+
+
+class IngestJob(Base):
+    """
+    A queued upload. Workers claim queued rows, move them through the
+    ingest stages and store the outcome; the spooled file is removed once
+    the job finishes.
+    """
+
+    __tablename__ = "ingest_jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # queued -> running -> succeeded | failed
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)
+    # Last ingest stage the job entered, for progress reporting
+    stage: Mapped[str] = mapped_column(String(16), default="queued")
+    filename: Mapped[str] = mapped_column(String)
+    path: Mapped[str] = mapped_column(String)
+    raw_sha256: Mapped[str] = mapped_column(String(64))
+    pdf_engine: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    worker: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    created_at = mapped_column(DateTime, server_default=func.now())
+    started_at = mapped_column(DateTime, nullable=True)
+    # Refreshed by the owning worker while the job runs; a job whose
+    # heartbeat stops is reclaimed
+    heartbeat_at = mapped_column(DateTime, nullable=True)
+    finished_at = mapped_column(DateTime, nullable=True)
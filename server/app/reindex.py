@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Template
+from app.migrate import add_missing_columns
+from app.services.gemini import embedding_fingerprint, template_embedding_text
+from app.services.llm import EMBED_BATCH_CONCURRENCY, EMBED_BATCH_SIZE, embed_many
+
+
+# Rows embedded and committed per round, so an interrupted run keeps its progress
+COMMIT_EVERY = 1000
+
+
+async def reindex_templates(
+    db: Session,
+    force: bool = False,
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = EMBED_BATCH_CONCURRENCY,
+) -> dict:
+    """
+    Recompute template embeddings whose input text or model changed since
+    they were stored (all of them with `force`), in batched requests.
+    """
+    rows = db.query(
+        Template.id,
+        Template.title,
+        Template.tags,
+        Template.version,
+        Template.embedding_hash,
+    ).all()
+
+    pending = []
+    for row in rows:
+        text = template_embedding_text(row.title, row.tags)
+        fingerprint = embedding_fingerprint(text)
+        if force or row.embedding_hash != fingerprint:
+            pending.append((row.id, row.version, text, fingerprint))
+
+    for start in range(0, len(pending), COMMIT_EVERY):
+        chunk = pending[start : start + COMMIT_EVERY]
+        embeddings = await embed_many(
+            [text for _, _, text, _ in chunk],
+            batch_size=batch_size,
+            concurrency=concurrency,
+        )
+
+        # Bumping the version lets other workers' catalogs notice the change
+        db.execute(
+            update(Template),
+            [
+                {
+                    "id": template_id,
+                    "embedding": embedding,
+                    "embedding_hash": fingerprint,
+                    "version": (version or 1) + 1,
+                }
+                for (template_id, version, _, fingerprint), embedding in zip(
+                    chunk, embeddings
+                )
+            ],
+        )
+        db.commit()
+        print(f"Re-embedded {start + len(chunk)}/{len(pending)} templates")
+
+    return {
+        "total": len(rows),
+        "reembedded": len(pending),
+        "unchanged": len(rows) - len(pending),
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Recompute template embeddings")
+    parser.add_argument(
+        "--force", action="store_true", help="re-embed every template"
+    )
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=EMBED_BATCH_CONCURRENCY)
+    args = parser.parse_args()
+
+    add_missing_columns()
+
+    db = SessionLocal()
+    try:
+        stats = asyncio.run(
+            reindex_templates(db, args.force, args.batch_size, args.concurrency)
+        )
+        print(
+            f"✅ Re-index complete: {stats['reembedded']} re-embedded, "
+            f"{stats['unchanged']} unchanged"
+        )
+    except Exception as e:
+        db.rollback()
+        print("Re-index failed:", e)
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -1,7 +1,10 @@
+import asyncio
 from sqlalchemy.orm import Session
 from app.models import Template
 from app.database import SessionLocal
-from app.services.gemini import embed_text
+from app.services.gemini import embedding_fingerprint, template_embedding_text
+from app.services.llm import embed_many
+from app.services.chat import precompute_questions, variables_fingerprint
 
 
 SEED_TEMPLATES = [
@@ -348,26 +351,64 @@ This Agreement shall be governed by and construed in accordance with the laws of
 ]
 
 
-def seed_templates(db: Session):
-    for tpl in SEED_TEMPLATES:
-        exists = db.query(Template).filter(Template.title == tpl["title"]).first()
-
-        if exists:
-            continue
-
-        embedding_text = " ".join([tpl["title"], " ".join(tpl["tags"])])
-
-        embedding = embed_text(embedding_text)
-
-        template = Template(
-            title=tpl["title"],
-            body=tpl["body"],
-            variables=tpl["variables"],
-            tags=tpl["similarity_tags"],
-            embedding=embedding,
+def _seed_fields(tpl: dict) -> dict:
+    """SEED_TEMPLATES entries use a few different key spellings."""
+    body = tpl.get("body") or tpl.get("body_md") or ""
+    title = tpl.get("title")
+    if not title:
+        # Fall back to the document's first heading
+        heading = next(
+            (line for line in body.splitlines() if line.startswith("#")), ""
+        )
+        title = heading.lstrip("#").strip()
+
+    return {
+        "title": title,
+        "body": body,
+        "variables": tpl.get("variables", []),
+        "tags": tpl.get("tags") or tpl.get("similarity_tags") or [],
+    }
+
+
+async def seed_templates(db: Session):
+    seeds = [_seed_fields(tpl) for tpl in SEED_TEMPLATES]
+
+    # One existence query for the whole set instead of one per template
+    titles = [seed["title"] for seed in seeds]
+    existing = {
+        title
+        for (title,) in db.query(Template.title).filter(Template.title.in_(titles))
+    }
+    seeds = [seed for seed in seeds if seed["title"] not in existing]
+    if not seeds:
+        return
+
+    embedding_texts = [
+        template_embedding_text(seed["title"], seed["tags"]) for seed in seeds
+    ]
+
+    embeddings, *questions = await asyncio.gather(
+        embed_many(embedding_texts),
+        *(precompute_questions(seed["variables"]) for seed in seeds),
+    )
+
+    for seed, text, embedding, seed_questions in zip(
+        seeds, embedding_texts, embeddings, questions
+    ):
+        db.add(
+            Template(
+                title=seed["title"],
+                body=seed["body"],
+                variables=seed["variables"],
+                tags=seed["tags"],
+                embedding=embedding,
+                embedding_hash=embedding_fingerprint(text),
+                questions=seed_questions or None,
+                questions_hash=(
+                    variables_fingerprint(seed["variables"]) if seed_questions else None
+                ),
+            )
         )
-
-        db.add(template)
 
     db.commit()
 
@@ -375,7 +416,7 @@ def seed_templates(db: Session):
 def run():
     db = SessionLocal()
     try:
-        seed_templates(db)
+        asyncio.run(seed_templates(db))
         print("✅ Templates seeded successfully")
     finally:
         db.close()
@@ -0,0 +1,137 @@
+import asyncio
+import os
+from typing import Dict, Optional
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models import Template
+from .cache import normalize_query
+from .chat import create_template, extract_template_hedged, prefill_variables_from_query
+from .singleflight import SingleFlight
+from .web_search import search_template_on_web
+
+
+# Store web-bootstrapped templates under a unique key so several workers
+# bootstrapping the same document type end up with one row
+BOOTSTRAP_UNIQUE_GUARD = os.getenv("BOOTSTRAP_UNIQUE_GUARD", "1") != "0"
+
+bootstrap_flights = SingleFlight("template_bootstrap")
+
+
+class BootstrapError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def bootstrap_key(title: str) -> str:
+    return normalize_query(title)[:255]
+
+
+async def _stored_bootstrap(key: str) -> Optional[Dict]:
+    async with AsyncSessionLocal() as db:
+        row = (
+            await db.execute(
+                select(Template.id, Template.variables).where(
+                    Template.bootstrap_key == key
+                )
+            )
+        ).first()
+    if row is None:
+        return None
+    return {"template_id": row.id, "variables": row.variables}
+
+
+# Variables of each in-flight bootstrap, resolved as soon as extraction is
+# done so callers can prefill while the template is being stored
+_extracted_variables: Dict[str, asyncio.Future] = {}
+
+
+async def _bootstrap(title: str, key: str, extracted_variables: asyncio.Future) -> Dict:
+    try:
+        if BOOTSTRAP_UNIQUE_GUARD:
+            stored = await _stored_bootstrap(key)
+            if stored:
+                return stored
+
+        web_results = await search_template_on_web(title)
+        if not web_results:
+            raise BootstrapError(404, "No template found on web")
+
+        extracted = await extract_template_hedged(web_results)
+        if not extracted:
+            raise BootstrapError(500, "LLM failed to extract template")
+
+        extracted_variables.set_result(extracted["variables"])
+        return await _store(title, key, extracted)
+    finally:
+        if _extracted_variables.get(key) is extracted_variables:
+            del _extracted_variables[key]
+
+
+def _start_bootstrap(title: str, key: str):
+    # Runs synchronously inside SingleFlight.do, so the future is registered
+    # before any caller can join the flight
+    extracted_variables = asyncio.get_running_loop().create_future()
+    _extracted_variables[key] = extracted_variables
+    return _bootstrap(title, key, extracted_variables)
+
+
+async def _store(title: str, key: str, extracted: Dict) -> Dict:
+    async with AsyncSessionLocal() as db:
+        template = await create_template(
+            title=title,
+            raw_text=extracted["body"],
+            analysis={
+                "variables": extracted["variables"],
+                "similarity_tags": extracted.get("similarity_tags", []),
+            },
+            db=db,
+            bootstrap_key=key if BOOTSTRAP_UNIQUE_GUARD else None,
+        )
+        # Another worker may have stored this document type first, with
+        # variables of its own extraction
+        return {"template_id": template.id, "variables": template.variables}
+
+
+async def bootstrap_template(title: str, query: str) -> tuple[int, Dict[str, str]]:
+    """
+    Find a template for `title` on the web and store it, returning
+    (template_id, values prefilled from `query`).
+
+    Concurrent calls for the same normalized title share one search,
+    extraction and insert; only the per-query prefill runs per caller,
+    overlapping the insert.
+    """
+    key = bootstrap_key(title)
+
+    stored = bootstrap_flights.do(key, lambda: _start_bootstrap(title, key))
+    extracted_variables = _extracted_variables.get(key)
+
+    variables, prefill = None, None
+    if extracted_variables is not None:
+        await asyncio.wait(
+            {extracted_variables, stored}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if extracted_variables.done():
+            variables = extracted_variables.result()
+            prefill = asyncio.ensure_future(
+                prefill_variables_from_query(query, variables)
+            )
+
+    try:
+        result = await stored
+    except BaseException:
+        if prefill:
+            prefill.cancel()
+        raise
+
+    if prefill is not None and result["variables"] == variables:
+        return result["template_id"], await prefill
+
+    if prefill:
+        prefill.cancel()
+    prefilled = await prefill_variables_from_query(query, result["variables"])
+    return result["template_id"], prefilled
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+MISSING = object()
+
+# Every cache registers itself here so /metrics can report hit rates;
+# entries only need a stats() method
+CACHE_REGISTRY: dict[str, object] = {}
+
+
+def normalize_query(text: str) -> str:
+    """Fold case, punctuation and whitespace so near-identical requests share a key."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(
+        " " if unicodedata.category(ch).startswith("P") else ch for ch in text
+    )
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after `ttl` seconds.
+
+    With `disk_path` set, entries are also written to a SQLite file and
+    memory misses fall back to it, so the cache survives restarts. Expired
+    rows are pruned every `prune_every` writes, along with the soonest to
+    expire beyond `disk_maxsize`. `dumps`/`loads` convert values to
+    something SQLite can store.
+
+    Async callers should use aget/aset, which do disk I/O in a worker thread.
+    """
+
+    prune_every = 256
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        disk_path: Optional[str] = None,
+        disk_maxsize: int = 100_000,
+        dumps: Callable[[Any], Any] = json.dumps,
+        loads: Callable[[Any], Any] = json.loads,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_maxsize = disk_maxsize
+        self._dumps = dumps
+        self._loads = loads
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._disk = None
+        # The SQLite connection has its own lock, so memory hits never wait
+        # behind disk I/O
+        self._disk_lock = threading.Lock()
+        self._disk_writes = 0
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+            )
+            self._disk.execute(
+                "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)"
+            )
+            self._prune()
+            self._disk.commit()
+
+        CACHE_REGISTRY[name] = self
+
+    def get(self, key: str) -> Any:
+        value = self._memory_get(key)
+        if value is MISSING and self._disk is not None:
+            value = self._disk_lookup(key)
+        return value
+
+    async def aget(self, key: str) -> Any:
+        """get() that reads the disk tier off the event loop."""
+        value = self._memory_get(key)
+        if value is MISSING and self._disk is not None:
+            value = await asyncio.to_thread(self._disk_lookup, key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """`ttl` overrides the cache-wide expiry for this entry."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._remember(key, value, time.monotonic(), ttl)
+
+        if self._disk is not None:
+            self._disk_put(key, value, ttl)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None):
+        """set() that writes the disk tier off the event loop."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._remember(key, value, time.monotonic(), ttl)
+
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk_put, key, value, ttl)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.execute("DELETE FROM cache")
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+                ),
+            }
+
+    def _remember(self, key: str, value: Any, now: float, ttl: float = None):
+        self._data[key] = (now + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _memory_get(self, key: str) -> Any:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+            if self._disk is None:
+                self.misses += 1
+            return MISSING
+
+    def _disk_lookup(self, key: str) -> Any:
+        with self._disk_lock:
+            value, remaining = self._disk_get(key)
+
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self._remember(key, value, time.monotonic(), remaining)
+                self.disk_hits += 1
+        return value
+
+    def _disk_get(self, key: str) -> tuple[Any, float]:
+        row = self._disk.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return MISSING, 0.0
+
+        value, expires_at = row
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            self._disk.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._disk.commit()
+            return MISSING, 0.0
+
+        return self._loads(value), remaining
+
+    def _disk_put(self, key: str, value: Any, ttl: float):
+        data = self._dumps(value)
+        with self._disk_lock:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                (key, data, time.time() + ttl),
+            )
+            self._disk_writes += 1
+            if self._disk_writes % self.prune_every == 0:
+                self._prune()
+            self._disk.commit()
+
+    def _prune(self):
+        self._disk.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        (rows,) = self._disk.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if rows > self.disk_maxsize:
+            self._disk.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY expires_at LIMIT ?)",
+                (rows - self.disk_maxsize,),
+            )
@@ -1,15 +1,29 @@
 import asyncio
-from typing import List, Dict
+from typing import AsyncIterator, Dict
 import json
-from app.services.gemini import embed_text
-from app.models import Template
-from sqlalchemy.orm import Session
-from app.services.gemini import client
 import re
+import hashlib
+from app.services.gemini import (
+    embed_query,
+    embed_text_async,
+    embedding_fingerprint,
+    template_embedding_text,
+)
+from app.services.llm import generate_json, generate_json_stream
+from app.models import Template
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from .web_search import build_template_extraction_prompt
+from .index import TemplateIndex, template_index
+from .templatize import Templatizer
 import math
 from pydantic import BaseModel
 from typing import Optional
+import os
+
+# How many web search results are extracted concurrently on the bootstrap path
+WEB_EXTRACT_FANOUT = int(os.getenv("WEB_EXTRACT_FANOUT", "3"))
 
 
 class TemplateMatchResult(BaseModel):
@@ -19,7 +33,7 @@ class TemplateMatchResult(BaseModel):
     title: Optional[str] = ""
 
 
-def gemini_choose_template(user_query: str, candidates: list):
+async def gemini_choose_template(user_query: str, candidates: list):
     """
     candidates = [
       {"id": 1, "title": "...", "tags": [...], "score": 0.82},
@@ -55,16 +69,9 @@ Output format:
 """
     try:
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=prompt,
-            config={
-                "temperature": 0,
-                "response_mime_type": "application/json",
-            },
-        )
+        response_text = await generate_json(prompt)
 
-        return TemplateMatchResult.model_validate_json(response.text)
+        return TemplateMatchResult.model_validate_json(response_text)
     except Exception as e:
         return TemplateMatchResult(
             best_template_id=None,
@@ -84,107 +91,81 @@ def cosine_similarity(a: list[float], b: list[float]) -> float:
 
 
 async def find_best_template(
-    user_query: str, templates: List[Dict]
+    user_query: str, index: TemplateIndex
 ) -> TemplateMatchResult | None:
 
-    query_embedding = await asyncio.to_thread(embed_text, user_query)
-
-    scored = []
-    for t in templates:
-        if not t.embedding:
-            continue
-
-        score = cosine_similarity(query_embedding, t.embedding)
-        scored.append(
-            {
-                "id": t.id,
-                "title": t.title,
-                "tags": t.tags,
-                "score": round(score, 3),
-            }
-        )
-
-    scored.sort(key=lambda x: x["score"], reverse=True)
+    query_embedding = await embed_query(user_query)
 
-    print("Score", scored)
+    top_candidates = index.search(query_embedding, k=3)
 
-    top_candidates = scored[:3]
+    print("Score", top_candidates)
 
-    result = gemini_choose_template(user_query, top_candidates)
+    result = await gemini_choose_template(user_query, top_candidates)
 
     return result
 
 
-def create_template(
+async def create_template(
     title: str,
     raw_text: str,
     analysis: dict,
-    db: Session,
+    db: AsyncSession,
+    bootstrap_key: Optional[str] = None,
 ) -> Template:
-    body = raw_text
-
-    # Variable replacement
-    for var in analysis.get("variables", []):
-        key = var.get("key")
-        example_val = var.get("example", "")
-
-        if not key or not example_val or len(example_val.strip()) < 2:
-            continue
-
-        try:
-            pattern = re.compile(
-                rf"\b{re.escape(example_val)}\b",
-                re.IGNORECASE,
-            )
-
-            body = pattern.sub(f"{{{{{key}}}}}", body)
-        except re.error:
-            continue
-
-    # Optional signature line replacement
-    for var in analysis.get("variables", []):
-        key = var.get("key")
-        example_val = var.get("example", "")
-
-        if not key or not example_val:
-            continue
-
-        try:
-            pattern = re.compile(
-                rf"Name:\s*{re.escape(example_val)}",
-                re.IGNORECASE,
-            )
-            body = pattern.sub(f"Name: {{{{{key}}}}}", body)
-        except re.error:
-            continue
+    """
+    With `bootstrap_key`, a template another worker already stored under the
+    same key is returned instead of inserting a duplicate.
+    """
+    # Variable and signature-line replacement in one pass over the text
+    body, _ = Templatizer(analysis.get("variables", [])).apply(raw_text)
 
     # Embedding
-    embedding_text = " ".join(
-        [
-            title,
-            " ".join(analysis.get("similarity_tags", [])),
-        ]
-    )
+    embedding_text = template_embedding_text(title, analysis.get("similarity_tags", []))
+
+    variables = analysis.get("variables", [])
 
-    embedding = embed_text(embedding_text)
+    # Questions only depend on the variable specs, so build them once here
+    # alongside the embedding instead of on every draft
+    embedding, questions = await asyncio.gather(
+        embed_text_async(embedding_text),
+        precompute_questions(variables) if variables else asyncio.sleep(0, {}),
+    )
 
     # Save template
     new_template = Template(
         title=title,
         body=body,
-        variables=analysis.get("variables", []),
+        variables=variables,
         tags=analysis.get("similarity_tags", []),
         embedding=embedding,
+        embedding_hash=embedding_fingerprint(embedding_text),
+        questions=questions or None,
+        questions_hash=variables_fingerprint(variables) if questions else None,
+        bootstrap_key=bootstrap_key,
     )
 
     db.add(new_template)
-    db.commit()
-    db.refresh(new_template)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        if bootstrap_key is None:
+            raise
+        existing = await db.scalar(
+            select(Template).where(Template.bootstrap_key == bootstrap_key)
+        )
+        if existing is None:
+            raise
+        print("Bootstrap already stored by another worker:", bootstrap_key)
+        return existing
+    await db.refresh(new_template)
+
+    template_index.add(new_template)
 
     return new_template
 
 
-def prefill_variables_from_query(
+async def prefill_variables_from_query(
     user_query: str,
     variables: list,
 ):
@@ -223,35 +204,21 @@ Output example:
 {{ "policy_number": "302786965" }}
 """
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash-lite",
-        contents=prompt,
-        config={
-            "temperature": 0,
-            "response_mime_type": "application/json",
-        },
-    )
+    response_text = await generate_json(prompt)
 
     try:
-        return json.loads(response.text)
+        return json.loads(response_text)
     except Exception:
         return {}
 
 
-def extract_template_from_web(title: str, raw_text: str):
+async def extract_template_from_web(title: str, raw_text: str):
     prompt = build_template_extraction_prompt(title, raw_text)
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=prompt,
-            config={
-                "temperature": 0,
-                "response_mime_type": "application/json",
-            },
-        )
+        response_text = await generate_json(prompt)
 
-        result = json.loads(response.text)
+        result = json.loads(response_text)
 
         return result
 
@@ -260,20 +227,44 @@ def extract_template_from_web(title: str, raw_text: str):
         return None
 
 
-async def generate_friendly_questions(variables: list[Dict]) -> Dict[str, str]:
+def is_valid_extraction(result) -> bool:
+    if not isinstance(result, dict):
+        return False
+    body, variables = result.get("body"), result.get("variables")
+    return (
+        isinstance(body, str)
+        and bool(body.strip())
+        and isinstance(variables, list)
+        and all(isinstance(v, dict) and v.get("key") for v in variables)
+    )
+
+
+async def extract_template_hedged(
+    candidates: list[Dict], fanout: int = WEB_EXTRACT_FANOUT
+) -> Optional[dict]:
     """
-    variables = [
-      {"key": "...", "label": "...", "description": "...", "dtype": "..."}
+    Run extract_template_from_web on the top `fanout` search results at once
+    and return the first valid extraction, cancelling the rest. Returns None
+    only if every attempt fails.
+    """
+    tasks = [
+        asyncio.create_task(extract_template_from_web(c["title"], c["raw_text"]))
+        for c in candidates[: max(fanout, 1)]
     ]
 
-    Returns:
-    {
-      "policy_number": "What is the insurance policy number exactly as it appears on the policy schedule?",
-      "incident_date": "On what date did the incident occur? (YYYY-MM-DD)"
-    }
-    """
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if is_valid_extraction(result):
+                return result
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
 
-    prompt = f"""
+
+def build_questions_prompt(variables: list[Dict]) -> str:
+    return f"""
 You are a legal drafting assistant.
 
 Generate one clear, professional, human-friendly question for each variable below.
@@ -298,16 +289,178 @@ Output:
 }}
 """
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash-lite",
-        contents=prompt,
-        config={
-            "temperature": 0,
-            "response_mime_type": "application/json",
-        },
-    )
+
+async def generate_friendly_questions(variables: list[Dict]) -> Dict[str, str]:
+    """
+    variables = [
+      {"key": "...", "label": "...", "description": "...", "dtype": "..."}
+    ]
+
+    Returns:
+    {
+      "policy_number": "What is the insurance policy number exactly as it appears on the policy schedule?",
+      "incident_date": "On what date did the incident occur? (YYYY-MM-DD)"
+    }
+    """
+
+    response_text = await generate_json(build_questions_prompt(variables))
 
     try:
-        return json.loads(response.text)
+        return json.loads(response_text)
     except Exception:
         return {}
+
+
+async def precompute_questions(variables: list[Dict]) -> Dict[str, str]:
+    """
+    generate_friendly_questions for a template being stored. Best-effort:
+    a failure leaves the template without questions, and drafts generate
+    them on first use instead.
+    """
+    try:
+        return await generate_friendly_questions(variables)
+    except Exception as e:
+        print("Question precompute failed:", e)
+        return {}
+
+
+# A complete "key": "question" pair; an unterminated value doesn't match yet
+QUESTION_PAIR = re.compile(r'"((?:[^"\\]|\\.)*)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+async def stream_friendly_questions(
+    variables: list[Dict],
+) -> AsyncIterator[tuple[str, str]]:
+    """
+    generate_friendly_questions, yielding each (key, question) pair as soon
+    as the model has finished writing it.
+    """
+    keys = {v["key"] for v in variables}
+    emitted = set()
+    buffer = ""
+    position = 0
+
+    async for chunk in generate_json_stream(build_questions_prompt(variables)):
+        buffer += chunk
+        for match in QUESTION_PAIR.finditer(buffer, position):
+            position = match.end()
+            try:
+                key, question = (json.loads(f'"{g}"') for g in match.groups())
+            except ValueError:
+                continue
+            if key in keys and key not in emitted:
+                emitted.add(key)
+                yield key, question
+
+    # Anything the pair scan couldn't read, e.g. oddly escaped values
+    try:
+        questions = json.loads(buffer)
+    except Exception:
+        return
+    if not isinstance(questions, dict):
+        return
+    for key, question in questions.items():
+        if key in keys and key not in emitted and isinstance(question, str):
+            emitted.add(key)
+            yield key, question
+
+
+def variables_fingerprint(variables: list[Dict]) -> str:
+    spec = [
+        {
+            field: v.get(field, "")
+            for field in ("key", "label", "description", "example", "dtype")
+        }
+        for v in variables
+    ]
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def stored_questions(template: Template) -> Optional[Dict[str, str]]:
+    """Persisted questions, or None if missing or built for other variables."""
+    if not template.questions:
+        return None
+    if template.questions_hash != variables_fingerprint(template.variables):
+        return None
+    return template.questions
+
+
+def select_missing_questions(
+    variables: list[Dict], prefilled_answers: Dict, questions: Dict[str, str]
+) -> Dict[str, str]:
+    return {
+        v["key"]: questions[v["key"]]
+        for v in variables
+        if v["key"] not in prefilled_answers and v["key"] in questions
+    }
+
+
+async def prefill_and_generate_questions(
+    user_query: str, variables: list[Dict]
+) -> tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Runs prefill and question generation concurrently. Questions are
+    generated speculatively for every variable; callers narrow them with
+    select_missing_questions.
+
+    Returns (prefilled_answers, questions)
+    """
+
+    prefilled_answers, questions = await asyncio.gather(
+        prefill_variables_from_query(user_query=user_query, variables=variables),
+        generate_friendly_questions(variables),
+    )
+
+    return prefilled_answers, questions
+
+
+def save_questions(template: Template, questions: Dict[str, str]):
+    template.questions = questions
+    template.questions_hash = variables_fingerprint(template.variables)
+
+
+async def load_questions(template: Template, db: AsyncSession) -> Dict[str, str]:
+    """
+    The template's questions, from storage when still valid, otherwise
+    generated and stored for the next draft.
+    """
+    questions = stored_questions(template)
+    if questions is not None:
+        return questions
+    if not template.variables:
+        return {}
+
+    questions = await generate_friendly_questions(template.variables)
+    if questions:
+        save_questions(template, questions)
+        db.add(template)
+        await db.commit()
+    return questions
+
+
+async def prefill_and_load_questions(
+    user_query: str, template: Template, db: AsyncSession
+) -> tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Prefills from the query and returns the template's questions, using the
+    persisted ones when they are still valid. Otherwise they are generated
+    alongside the prefill and stored for the next draft.
+    """
+
+    questions = stored_questions(template)
+    if questions is not None:
+        prefilled_answers = await prefill_variables_from_query(
+            user_query=user_query, variables=template.variables
+        )
+        return prefilled_answers, questions
+
+    prefilled_answers, questions = await prefill_and_generate_questions(
+        user_query, template.variables
+    )
+
+    if questions:
+        save_questions(template, questions)
+        db.add(template)
+        await db.commit()
+
+    return prefilled_answers, questions
@@ -0,0 +1,112 @@
+import hashlib
+import re
+import threading
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import IngestRecord, Template
+from .cache import CACHE_REGISTRY
+
+
+def text_fingerprint(text: str) -> str:
+    """SHA-256 of the extracted text with whitespace collapsed."""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class DedupStats:
+    def __init__(self, name: str):
+        self._lock = threading.Lock()
+        self.raw_hits = 0
+        self.text_hits = 0
+        self.misses = 0
+        CACHE_REGISTRY[name] = self
+
+    def record(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.raw_hits + self.text_hits + self.misses
+            return {
+                "raw_hits": self.raw_hits,
+                "text_hits": self.text_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    round((self.raw_hits + self.text_hits) / lookups, 4)
+                    if lookups
+                    else 0.0
+                ),
+            }
+
+
+dedup_stats = DedupStats("ingest_dedup")
+
+
+def _template_exists(db: Session, template_id: Optional[int]) -> bool:
+    if template_id is None:
+        return False
+    return db.query(Template.id).filter(Template.id == template_id).first() is not None
+
+
+def find_by_raw_hash(db: Session, raw_sha256: str) -> Optional[IngestRecord]:
+    """Record for identical bytes whose template still exists."""
+    record = (
+        db.query(IngestRecord).filter(IngestRecord.raw_sha256 == raw_sha256).first()
+    )
+    if record and _template_exists(db, record.template_id):
+        return record
+    return None
+
+
+def find_by_text_hash(db: Session, text_sha256: str) -> Optional[IngestRecord]:
+    """
+    Latest record with the same extracted text. Its analysis is reusable even
+    if the template it produced has since been deleted.
+    """
+    return (
+        db.query(IngestRecord)
+        .filter(IngestRecord.text_sha256 == text_sha256)
+        .order_by(IngestRecord.id.desc())
+        .first()
+    )
+
+
+def template_for(db: Session, record: Optional[IngestRecord]) -> Optional[int]:
+    if record and _template_exists(db, record.template_id):
+        return record.template_id
+    return None
+
+
+def save_ingest_record(
+    db: Session,
+    raw_sha256: str,
+    text_sha256: str,
+    analysis: dict,
+    template_id: Optional[int],
+):
+    try:
+        existing = (
+            db.query(IngestRecord)
+            .filter(IngestRecord.raw_sha256 == raw_sha256)
+            .first()
+        )
+        if existing:
+            existing.text_sha256 = text_sha256
+            existing.analysis = analysis
+            existing.template_id = template_id
+        else:
+            db.add(
+                IngestRecord(
+                    raw_sha256=raw_sha256,
+                    text_sha256=text_sha256,
+                    analysis=analysis,
+                    template_id=template_id,
+                )
+            )
+        db.commit()
+    except IntegrityError:
+        # A concurrent upload of the same bytes recorded it first
+        db.rollback()
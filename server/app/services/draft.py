@@ -0,0 +1,213 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models import Template
+from .bootstrap import BootstrapError, bootstrap_template
+from .chat import (
+    TemplateMatchResult,
+    find_best_template,
+    prefill_variables_from_query,
+    save_questions,
+    select_missing_questions,
+    stored_questions,
+    stream_friendly_questions,
+)
+from .index import template_index
+
+
+MATCH_MIN_CONFIDENCE = 0.6
+
+
+def needs_bootstrap(result: TemplateMatchResult) -> bool:
+    return result.best_template_id is None or result.confidence < MATCH_MIN_CONFIDENCE
+
+
+def draft_payload(
+    template: Template,
+    prefilled_answers: Dict[str, str],
+    questions: Dict[str, str],
+    confidence: Optional[float],
+    reason: Optional[str],
+) -> dict:
+    """The /start-draft response for a chosen template and prefill."""
+    missing_vars = [v for v in template.variables if v["key"] not in prefilled_answers]
+
+    if missing_vars:
+        questions = select_missing_questions(
+            template.variables, prefilled_answers, questions
+        )
+
+        return {
+            "template_id": template.id,
+            "template_title": template.title,
+            "prefilled": prefilled_answers,
+            "questions": questions,
+            "missing_keys": list(questions.keys()),
+        }
+
+    return {
+        "template_id": template.id,
+        "confidence": confidence,
+        "reason": reason,
+        "template_title": template.title,
+    }
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _prefill_and_stream_questions(
+    query: str, template: Template, prefilled: Optional[Dict[str, str]] = None
+) -> AsyncIterator[tuple[str, object]]:
+    """
+    Runs the prefill and question generation concurrently, yielding
+    ("prefilled", values) once, ("question", (key, question)) per question
+    and finally ("questions", all questions). A known `prefilled` is
+    yielded first instead of prefilling again.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def prefill():
+        try:
+            if prefilled is None:
+                values = await prefill_variables_from_query(query, template.variables)
+            else:
+                values = prefilled
+            await events.put(("prefilled", values))
+        except Exception as e:
+            await events.put(("failed", e))
+
+    async def ask():
+        questions = {}
+        try:
+            async for key, question in stream_friendly_questions(template.variables):
+                questions[key] = question
+                await events.put(("question", (key, question)))
+        except Exception as e:
+            await events.put(("failed", e))
+            return
+        await events.put(("questions", questions))
+
+    tasks = [asyncio.create_task(prefill()), asyncio.create_task(ask())]
+    try:
+        for _ in range(2):
+            while True:
+                kind, value = await events.get()
+                if kind == "failed":
+                    raise value
+                yield kind, value
+                if kind != "question":
+                    break
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _draft_events(query: str, db: AsyncSession) -> AsyncIterator[str]:
+    yield sse_event("stage", {"stage": "matching"})
+
+    await template_index.ensure_loaded_async()
+    try:
+        result = await find_best_template(query, template_index)
+    except Exception as e:
+        print("error", e)
+        raise HTTPException(500, "Template matching failed")
+
+    if needs_bootstrap(result):
+        yield sse_event("stage", {"stage": "searching_web", "title": result.title})
+        try:
+            template_id, prefilled = await bootstrap_template(result.title, query)
+        except BootstrapError as e:
+            raise HTTPException(e.status_code, e.detail)
+
+        template = await db.get(Template, template_id)
+        is_new_template = True
+        confidence = reason = None
+    else:
+        template = await db.get(Template, result.best_template_id)
+        if not template:
+            raise HTTPException(404, "Template not found")
+        prefilled = None
+        is_new_template = False
+        confidence, reason = result.confidence, result.reason
+
+    yield sse_event(
+        "template",
+        {
+            "template_id": template.id,
+            "template_title": template.title,
+            "confidence": confidence,
+            "reason": reason,
+            "is_new_template": is_new_template,
+        },
+    )
+
+    questions = stored_questions(template)
+    if questions is None and not template.variables:
+        questions = {}
+
+    if questions is not None:
+        if prefilled is None:
+            prefilled = await prefill_variables_from_query(query, template.variables)
+        yield sse_event("prefilled", prefilled)
+        for key, question in select_missing_questions(
+            template.variables, prefilled, questions
+        ).items():
+            yield sse_event("question", {"key": key, "question": question})
+    else:
+        # Questions that arrive before the prefill are held back until it is
+        # known whether they are still needed
+        held = []
+        async for kind, value in _prefill_and_stream_questions(
+            query, template, prefilled
+        ):
+            if kind == "prefilled":
+                prefilled = value
+                yield sse_event("prefilled", prefilled)
+                for key, question in held:
+                    if key not in prefilled:
+                        yield sse_event("question", {"key": key, "question": question})
+            elif kind == "question":
+                key, question = value
+                if prefilled is None:
+                    held.append(value)
+                elif key not in prefilled:
+                    yield sse_event("question", {"key": key, "question": question})
+            else:
+                questions = value
+
+        if questions:
+            save_questions(template, questions)
+            await db.commit()
+
+    yield sse_event(
+        "done", draft_payload(template, prefilled, questions, confidence, reason)
+    )
+
+
+async def stream_draft(query: str) -> AsyncIterator[str]:
+    """
+    /start-draft as Server-Sent Events: "stage" updates, then "template",
+    "prefilled", one "question" per missing variable as the model writes it,
+    and "done" with the same body /start-draft returns. Failures end the
+    stream with an "error" event.
+    """
+    # The response outlives the request's dependencies, so the stream
+    # keeps its own session
+    async with AsyncSessionLocal() as db:
+        try:
+            async for event in _draft_events(query, db):
+                yield event
+        except HTTPException as e:
+            yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            print("Draft stream failed:", e)
+            yield sse_event(
+                "error", {"status_code": 500, "detail": "Internal server error"}
+            )
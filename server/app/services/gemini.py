@@ -1,16 +1,18 @@
-import google.genai as genai
 from pydantic import BaseModel, Field
 from typing import List, Optional
-import os
 import asyncio
-
-
-API_KEY = os.getenv("GOOGLE_API_KEY", "").strip()
-print("API key length:", len(os.getenv("GOOGLE_API_KEY", "")))
-if not API_KEY:
-    raise RuntimeError("GOOGLE_API_KEY environment variable not set")
-
-client = genai.Client(api_key=API_KEY)
+import os
+import re
+import hashlib
+import numpy as np
+from app.models import pack_embedding, unpack_embedding
+from .cache import TTLCache, MISSING, normalize_query
+from .llm import (
+    EMBED_MAX_CHARS,
+    EMBEDDING_MODEL,
+    embed_content,
+    generate_json,
+)
 
 
 class VariableSchema(BaseModel):
@@ -41,22 +43,192 @@ def normalize_variables(vars: list[VariableSchema]) -> list[dict]:
     ]
 
 
-def embed_text(text: str) -> list[float]:
-    response = client.models.embed_content(
-        model="gemini-embedding-001",
-        contents=text[:8000],
-    )
-    if not response.embeddings:
-        raise ValueError("No embeddings returned from Gemini")
+async def embed_text_async(text: str) -> list[float]:
+    embeddings = await embed_content(text[:EMBED_MAX_CHARS])
+    return embeddings[0]
+
+
+def template_embedding_text(title: str, tags: Optional[list]) -> str:
+    """What a template's stored embedding is computed from."""
+    return " ".join([title or "", " ".join(tags or [])])
+
+
+def embedding_fingerprint(text: str, model: str = EMBEDDING_MODEL) -> str:
+    """Changes when either the embedded text or the embedding model does."""
+    return hashlib.sha256(
+        f"{model}\n{text[:EMBED_MAX_CHARS]}".encode("utf-8")
+    ).hexdigest()
+
+
+query_embedding_cache = TTLCache(
+    "query_embeddings",
+    maxsize=int(os.getenv("EMBED_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("EMBED_CACHE_TTL", "86400")),
+    disk_path=os.getenv("EMBED_CACHE_PATH") or None,
+    disk_maxsize=int(os.getenv("EMBED_CACHE_DISK_SIZE", "100000")),
+    dumps=pack_embedding,
+    loads=unpack_embedding,
+)
+
+# Part of every cache key along with the model name; bump it when query
+# embeddings change in a way the model name doesn't show (task type,
+# output dimensionality), so persisted entries from before are never served
+QUERY_EMBEDDING_VERSION = 1
+
+
+def query_embedding_key(text: str, model: str = EMBEDDING_MODEL) -> str:
+    return f"{model}:v{QUERY_EMBEDDING_VERSION}:{normalize_query(text)}"
+
+
+async def embed_query(text: str) -> np.ndarray:
+    """embed_text_async for user queries, served from cache for repeat requests."""
+    key = query_embedding_key(text)
+
+    cached = await query_embedding_cache.aget(key)
+    if cached is not MISSING:
+        return cached
+
+    embedding = np.asarray(await embed_text_async(text), dtype=np.float32)
+    await query_embedding_cache.aset(key, embedding)
+    return embedding
+
+
+# Documents longer than this are analyzed as concurrent section-aligned
+# chunks whose results are merged
+ANALYSIS_CHUNK_CHARS = int(os.getenv("ANALYSIS_CHUNK_CHARS", "30000"))
+
+# "1.", "12.3", "Section 4", "ARTICLE IV", "## Heading", "SCHEDULE A", ...
+SECTION_BOUNDARY = re.compile(
+    r"^[ \t]*(?:#{1,6}\s|\d+(?:\.\d+)*[.)]\s|"
+    r"(?:section|article|clause|schedule|annex|appendix|exhibit)\s+[\w.]+)",
+    re.IGNORECASE | re.MULTILINE,
+)
 
-    return response.embeddings[0].values
+
+def _split_oversized(section: str, max_chars: int) -> list[str]:
+    """Break one section by paragraphs, then lines, then hard cuts."""
+    for separator in ("\n\n", "\n"):
+        parts = section.split(separator)
+        if len(parts) > 1:
+            break
+    else:
+        return [section[i : i + max_chars] for i in range(0, len(section), max_chars)]
+
+    pieces = []
+    for i, part in enumerate(parts):
+        # Keep separators so the pieces rejoin to the original text
+        trailer = separator if i < len(parts) - 1 else ""
+        if len(part) + len(trailer) <= max_chars:
+            pieces.append(part + trailer)
+            continue
+
+        # Split the bare part: with its separator re-attached it would split
+        # back into the same part and recurse forever
+        sub_pieces = _split_oversized(part, max_chars)
+        if len(sub_pieces[-1]) + len(trailer) <= max_chars:
+            sub_pieces[-1] += trailer
+        elif trailer:
+            sub_pieces.append(trailer)
+        pieces.extend(sub_pieces)
+    return pieces
+
+
+def split_sections(text: str, max_chars: int = ANALYSIS_CHUNK_CHARS) -> list[str]:
+    """
+    Split text into chunks of at most `max_chars`, cutting at section
+    headings where possible and packing consecutive sections together.
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    starts = [m.start() for m in SECTION_BOUNDARY.finditer(text)]
+    bounds = [0] + [s for s in starts if s > 0] + [len(text)]
+    sections = [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+    chunks, current = [], ""
+    for section in sections:
+        pieces = [section] if len(section) <= max_chars else _split_oversized(section, max_chars)
+        for piece in pieces:
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+def merge_analyses(analyses: list[dict]) -> dict:
+    """
+    Merge per-chunk analyses in document order. A variable is kept once per
+    key and once per example (the first chunk to name a value owns it);
+    later duplicates only fill in missing fields. Tags are deduplicated
+    case-insensitively.
+    """
+    variables: dict[str, dict] = {}
+    example_owner: dict[str, str] = {}
+    tags: dict[str, str] = {}
+
+    for analysis in analyses:
+        for var in analysis.get("variables", []):
+            example = (var.get("example") or "").strip().casefold()
+            key = var["key"]
+
+            if key not in variables and example and example in example_owner:
+                key = example_owner[example]
+
+            existing = variables.get(key)
+            if existing is None:
+                variables[key] = dict(var)
+            else:
+                for field in ("label", "description", "example"):
+                    if not existing.get(field) and var.get(field):
+                        existing[field] = var[field]
+                existing["required"] = existing["required"] or var["required"]
+
+            if example:
+                example_owner.setdefault(example, key)
+
+        for tag in analysis.get("similarity_tags", []):
+            tags.setdefault(tag.strip().casefold(), tag.strip())
+
+    return {
+        "variables": list(variables.values()),
+        "similarity_tags": [t for t in tags.values() if t],
+    }
 
 
 async def analyze_document(text: str) -> dict:
-    return await asyncio.to_thread(analyze_document_sync, text)
+    """
+    Short documents take one call. Longer ones are split on section
+    boundaries and the chunks analyzed concurrently, so latency tracks the
+    slowest chunk rather than the whole document. A failed chunk only
+    loses its own variables; the call fails if every chunk does.
+    """
+    chunks = split_sections(text)
+    if len(chunks) == 1:
+        return await analyze_chunk(text)
 
+    print(f"Analyzing document in {len(chunks)} chunks")
+    results = await asyncio.gather(
+        *(analyze_chunk(chunk) for chunk in chunks), return_exceptions=True
+    )
+
+    analyses, errors = [], []
+    for i, result in enumerate(results):
+        if isinstance(result, BaseException):
+            print(f"Analysis of chunk {i + 1}/{len(chunks)} failed:", result)
+            errors.append(result)
+        else:
+            analyses.append(result)
+
+    if not analyses:
+        raise errors[0]
+    return merge_analyses(analyses)
 
-def analyze_document_sync(text: str) -> dict:
+
+async def analyze_chunk(text: str) -> dict:
 
     # Updated Prompt Snippet for gemini.py
     prompt = f"""
@@ -88,20 +260,12 @@ def analyze_document_sync(text: str) -> dict:
         }}
         """
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=prompt,
-            config={
-                "temperature": 0,
-                "response_mime_type": "application/json",
-                "response_schema": ExtractionResponse,
-            },
-        )
-
-        if not response.text or not response.text.strip():
+        response_text = await generate_json(prompt, response_schema=ExtractionResponse)
+
+        if not response_text or not response_text.strip():
             raise ValueError("Empty response from Gemini")
 
-        parsed = ExtractionResponse.model_validate_json(response.text)
+        parsed = ExtractionResponse.model_validate_json(response_text)
 
         return {
             "variables": normalize_variables(parsed.variables),
@@ -111,6 +275,6 @@ def analyze_document_sync(text: str) -> dict:
         print("Validation error:", e)
         raise
     except Exception as e:
-        raw = getattr(response, "text", None) if "response" in locals() else None
+        raw = response_text if "response_text" in locals() else None
         print("Raw response:", repr(raw))
         raise
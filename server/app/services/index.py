@@ -0,0 +1,522 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import SQLALCHEMY_DATABASE_URL, SessionLocal
+from app.models import Template
+
+
+# How often a worker checks whether other workers changed the templates table
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "5"))
+# The IVF index saves new bucket assignments after this many inserts or this
+# many seconds, whichever comes first, instead of on every insert
+IVF_PERSIST_EVERY = int(os.getenv("IVF_PERSIST_EVERY", "256"))
+IVF_PERSIST_SECONDS = float(os.getenv("IVF_PERSIST_SECONDS", "30"))
+
+
+def catalog_generation(db: Session) -> tuple:
+    """
+    (row count, max id, sum of versions): changes on any insert, delete or
+    body update, and costs one aggregate query instead of reading rows.
+    """
+    row = db.query(
+        func.count(Template.id),
+        func.max(Template.id),
+        func.sum(func.coalesce(Template.version, 1)),
+    ).one()
+    return (row[0] or 0, row[1] or 0, int(row[2] or 0))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class TemplateIndex:
+    """
+    Resident catalog of template matching metadata: ids, titles, tags and a
+    matrix of L2-normalized embeddings. Bodies and variables are never held
+    here; handlers load them by id once a template is chosen.
+
+    Scoring a query is one matrix-vector product; search() returns the
+    candidate dicts gemini_choose_template expects:
+      {"id": 1, "title": "...", "tags": [...], "score": 0.82}
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: list[int] = []
+        self._meta: list[dict] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._generation: tuple | None = None
+        self._checked_at = 0.0
+        # One generation check (and reload) at a time across threads
+        self._refresh_lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return self._size
+
+    def load(self, db: Session):
+        # Read the generation first, so a row inserted while loading makes
+        # the next check reload rather than go unnoticed
+        generation = catalog_generation(db)
+        rows = db.query(
+            Template.id, Template.title, Template.tags, Template.embedding
+        ).all()
+
+        ids, meta, vectors = [], [], []
+        for row in rows:
+            if row.embedding is None or len(row.embedding) == 0:
+                continue
+            ids.append(row.id)
+            meta.append({"title": row.title, "tags": row.tags or []})
+            vectors.append(np.asarray(row.embedding, dtype=np.float32))
+
+        if vectors:
+            matrix = normalize_rows(np.vstack(vectors))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+
+        self.set_rows(ids, meta, matrix)
+        with self._lock:
+            self._generation = generation
+            self._checked_at = time.monotonic()
+
+    def set_rows(self, ids: list[int], meta: list[dict], matrix: np.ndarray):
+        """Replace the index contents; matrix rows must already be normalized."""
+        with self._lock:
+            self._ids = list(ids)
+            self._meta = list(meta)
+            self._matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+            self._size = len(self._ids)
+            self.loaded = True
+
+    def ensure_loaded(self, db: Session):
+        """
+        Load on first use, then at most every CATALOG_REFRESH_SECONDS compare
+        the table's generation. Rows other workers inserted are appended;
+        only deletes and updates force a full reload. Between checks this
+        does no database I/O.
+        """
+        with self._refresh_lock:
+            if not self.loaded:
+                self.load(db)
+                return
+
+            now = time.monotonic()
+            if now - self._checked_at < CATALOG_REFRESH_SECONDS:
+                return
+            self._checked_at = now
+
+            generation = catalog_generation(db)
+            if generation == self._generation:
+                return
+            if not self._append_inserted(db, generation):
+                print("Template catalog changed, reloading")
+                self.load(db)
+
+    async def ensure_loaded_async(self):
+        """
+        ensure_loaded for request handlers: the check, and any reload, run
+        in a worker thread on a sync session instead of on the event loop.
+        """
+        if self.loaded and time.monotonic() - self._checked_at < CATALOG_REFRESH_SECONDS:
+            return
+
+        def check():
+            with SessionLocal() as db:
+                self.ensure_loaded(db)
+
+        await asyncio.to_thread(check)
+
+    def _append_inserted(self, db: Session, generation: tuple) -> bool:
+        """
+        Append rows with ids past the last seen max id. Returns False, and
+        changes nothing, when they don't account for the whole generation
+        change, i.e. rows were also deleted or updated.
+        """
+        if self._generation is None:
+            return False
+        count, max_id, versions = self._generation
+        if generation[1] <= max_id:
+            return False
+
+        rows = (
+            db.query(
+                Template.id,
+                Template.title,
+                Template.tags,
+                Template.embedding,
+                Template.version,
+            )
+            .filter(Template.id > max_id)
+            .order_by(Template.id)
+            .all()
+        )
+        expected = (
+            count + len(rows),
+            max(row.id for row in rows) if rows else max_id,
+            versions + sum(row.version or 1 for row in rows),
+        )
+        if expected != generation:
+            return False
+
+        added = [row for row in rows if row.embedding is not None and len(row.embedding)]
+        vectors = []
+        if added:
+            vectors = normalize_rows(
+                np.vstack([np.asarray(row.embedding, dtype=np.float32) for row in added])
+            )
+        with self._lock:
+            for row, vector in zip(added, vectors):
+                self._append(row.id, row.title, row.tags, vector)
+            self._generation = generation
+
+        print(f"Template catalog: appended {len(added)} new templates")
+        return True
+
+    def flush(self):
+        """Save anything held back from disk; the exact index keeps nothing there."""
+
+    def invalidate(self):
+        """Force a reload on the next ensure_loaded, e.g. after bulk updates."""
+        with self._lock:
+            self.loaded = False
+
+    def add(self, template: Template):
+        with self._lock:
+            # Account for our own insert so it doesn't look like a foreign change
+            if self._generation is not None:
+                count, max_id, versions = self._generation
+                self._generation = (
+                    count + 1,
+                    max(max_id, template.id),
+                    versions + (template.version or 1),
+                )
+
+        if template.embedding is None or len(template.embedding) == 0:
+            return
+
+        vector = np.asarray(template.embedding, dtype=np.float32)
+        vector = normalize_rows(vector[None, :])[0]
+
+        with self._lock:
+            self._append(template.id, template.title, template.tags, vector)
+
+    def _append(self, template_id: int, title: str, tags: list, vector: np.ndarray):
+        if self._size == 0:
+            self._matrix = np.empty((16, vector.shape[0]), dtype=np.float32)
+        elif self._size == self._matrix.shape[0]:
+            # Grow geometrically so repeated inserts stay amortized O(1)
+            grown = np.empty((self._size * 2, self._matrix.shape[1]), dtype=np.float32)
+            grown[: self._size] = self._matrix[: self._size]
+            self._matrix = grown
+
+        self._matrix[self._size] = vector
+        self._ids.append(template_id)
+        self._meta.append({"title": title, "tags": tags or []})
+        self._size += 1
+
+    def _candidates(self, matrix: np.ndarray, query: np.ndarray):
+        """Return (row positions, scores) to rank; exact scan scores every row."""
+        return None, matrix @ query
+
+    def search(self, query_embedding, k: int = 3) -> list[dict]:
+        with self._lock:
+            size = self._size
+            matrix = self._matrix[:size]
+            ids = self._ids[:size]
+            meta = self._meta[:size]
+
+        if size == 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+
+        positions, scores = self._candidates(matrix, query / norm)
+        if len(scores) == 0:
+            return []
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            row = i if positions is None else positions[i]
+            results.append(
+                {
+                    "id": ids[row],
+                    "title": meta[row]["title"],
+                    "tags": meta[row]["tags"],
+                    "score": round(float(scores[i]), 3),
+                }
+            )
+        return results
+
+
+class IVFTemplateIndex(TemplateIndex):
+    """
+    Inverted-file ANN index: rows are bucketed under the nearest of `nlist`
+    spherical k-means centroids and a query only scores the rows in its
+    `nprobe` closest buckets.
+
+    Centroids and bucket assignments persist to `path`, so startup only
+    re-reads the rows from the database instead of re-training. Libraries
+    smaller than `min_train_size` are scanned exactly.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        nlist: int | None = None,
+        nprobe: int = 8,
+        min_train_size: int = 2048,
+        persist_every: int = IVF_PERSIST_EVERY,
+        persist_seconds: float = IVF_PERSIST_SECONDS,
+    ):
+        super().__init__()
+        self.path = path
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.persist_every = persist_every
+        self.persist_seconds = persist_seconds
+        self._centroids: np.ndarray | None = None
+        # Grown like the matrix; only the first _size entries are meaningful
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lists: list[list[int]] = []
+        self._arrays: list[np.ndarray | None] = []
+        # Serializes saves so an older snapshot never replaces a newer one
+        self._persist_lock = threading.Lock()
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def set_rows(self, ids: list[int], meta: list[dict], matrix: np.ndarray):
+        super().set_rows(ids, meta, matrix)
+
+        with self._lock:
+            self._centroids = None
+            self._unsaved = 0
+            if self._size == 0:
+                return
+
+            persisted = self._read_persisted()
+            if persisted is not None:
+                self._restore(*persisted)
+            elif self._size >= self.min_train_size:
+                self._train()
+                self._unsaved = self.persist_every
+
+        self._persist_if_due()
+
+    def add(self, template: Template):
+        super().add(template)
+        self._persist_if_due()
+
+    def _append(self, template_id: int, title: str, tags: list, vector: np.ndarray):
+        super()._append(template_id, title, tags, vector)
+
+        if self.trained:
+            bucket = int(np.argmax(self._centroids @ vector))
+            position = self._size - 1
+            if position == len(self._assign):
+                grown = np.empty(max(16, position * 2), dtype=np.int32)
+                grown[:position] = self._assign
+                self._assign = grown
+            self._assign[position] = bucket
+            self._lists[bucket].append(position)
+            self._arrays[bucket] = None
+            self._unsaved += 1
+        elif self._size >= self.min_train_size:
+            self._train()
+            # A fresh training is expensive to redo, so it is saved right away
+            self._unsaved = self.persist_every
+
+    def _candidates(self, matrix: np.ndarray, query: np.ndarray):
+        with self._lock:
+            centroids = self._centroids
+            if centroids is not None:
+                nprobe = min(self.nprobe, len(centroids))
+                probes = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+                buckets = [self._bucket_array(c) for c in probes]
+
+        if centroids is None:
+            return super()._candidates(matrix, query)
+
+        positions = np.concatenate(buckets)
+        # Rows appended after the caller's snapshot are not in `matrix` yet
+        positions = positions[positions < len(matrix)]
+        if len(positions) == 0:
+            return positions, np.zeros(0, dtype=np.float32)
+
+        return positions, matrix[positions] @ query
+
+    def _bucket_array(self, bucket: int) -> np.ndarray:
+        array = self._arrays[bucket]
+        if array is None:
+            array = np.asarray(self._lists[bucket], dtype=np.int64)
+            self._arrays[bucket] = array
+        return array
+
+    def _train(self, iterations: int = 10, seed: int = 0):
+        matrix = self._matrix[: self._size]
+        nlist = self.nlist or max(1, int(4 * np.sqrt(self._size)))
+        nlist = min(nlist, self._size)
+
+        # Train on a sample; assigning the full library afterwards is cheap
+        rng = np.random.default_rng(seed)
+        sample_size = min(self._size, 64 * nlist)
+        sample = matrix[rng.choice(self._size, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = normalize_rows(centroids)
+
+        self._restore(centroids, self._assign_all(matrix, centroids))
+
+    @staticmethod
+    def _assign_all(matrix: np.ndarray, centroids: np.ndarray, chunk: int = 8192):
+        assign = np.empty(len(matrix), dtype=np.int32)
+        for start in range(0, len(matrix), chunk):
+            block = matrix[start : start + chunk]
+            assign[start : start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        return assign
+
+    def _restore(self, centroids: np.ndarray, assign: np.ndarray):
+        self._centroids = centroids.astype(np.float32, copy=False)
+        self._assign = assign.astype(np.int32, copy=False)
+        self._lists = [[] for _ in range(len(centroids))]
+        self._arrays = [None] * len(centroids)
+        for position, bucket in enumerate(self._assign.tolist()):
+            self._lists[bucket].append(position)
+
+    def _read_persisted(self):
+        if not os.path.exists(self.path):
+            return None
+
+        try:
+            with np.load(self.path) as data:
+                centroids = data["centroids"]
+                persisted = dict(zip(data["ids"].tolist(), data["assign"].tolist()))
+        except Exception as e:
+            print("Ignoring unreadable ANN index:", e)
+            return None
+
+        if centroids.shape[1] != self._matrix.shape[1]:
+            return None
+
+        # Rows inserted since the last save (e.g. by another worker) are
+        # assigned here rather than triggering a full re-train.
+        matrix = self._matrix[: self._size]
+        assign = np.empty(self._size, dtype=np.int32)
+        missing = []
+        for position, template_id in enumerate(self._ids):
+            bucket = persisted.get(template_id)
+            if bucket is None:
+                missing.append(position)
+            else:
+                assign[position] = bucket
+
+        if missing:
+            assign[missing] = self._assign_all(matrix[missing], centroids)
+
+        return centroids, assign
+
+    def _persist_if_due(self):
+        # Rows that never reach disk (e.g. on a crash) are only re-assigned
+        # by _read_persisted on the next load, so saves can be batched
+        with self._lock:
+            if not self._unsaved:
+                return
+            due = time.monotonic() - self._saved_at >= self.persist_seconds
+            if self._unsaved < self.persist_every and not due:
+                return
+        self.flush()
+
+    def flush(self):
+        with self._persist_lock:
+            with self._lock:
+                if not self._unsaved or self._centroids is None:
+                    return
+                centroids = self._centroids
+                ids = np.asarray(self._ids[: self._size], dtype=np.int64)
+                assign = self._assign[: self._size].copy()
+                self._unsaved = 0
+                self._saved_at = time.monotonic()
+
+            try:
+                self._persist(centroids, ids, assign)
+            except OSError as e:
+                print("Failed to save ANN index:", e)
+
+    def _persist(self, centroids: np.ndarray, ids: np.ndarray, assign: np.ndarray):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        # A private temp file per save, so processes sharing the index path
+        # never write into each other's file before the rename
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, centroids=centroids, ids=ids, assign=assign)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+def default_index_path() -> str:
+    path = os.getenv("TEMPLATE_INDEX_PATH")
+    if path:
+        return path
+
+    # Keep the index next to a SQLite database file
+    if SQLALCHEMY_DATABASE_URL.startswith("sqlite:///"):
+        db_path = SQLALCHEMY_DATABASE_URL[len("sqlite:///") :]
+        if db_path and db_path != ":memory:":
+            return os.path.splitext(db_path)[0] + ".ivf.npz"
+
+    return "./data/template_index.ivf.npz"
+
+
+def build_template_index() -> TemplateIndex:
+    kind = os.getenv("TEMPLATE_INDEX", "exact").strip().lower()
+
+    if kind == "ivf":
+        nlist = os.getenv("IVF_NLIST")
+        return IVFTemplateIndex(
+            path=default_index_path(),
+            nlist=int(nlist) if nlist else None,
+            nprobe=int(os.getenv("IVF_NPROBE", "8")),
+            min_train_size=int(os.getenv("IVF_MIN_TRAIN_SIZE", "2048")),
+        )
+
+    return TemplateIndex()
+
+
+template_index = build_template_index()
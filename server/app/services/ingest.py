@@ -0,0 +1,202 @@
+import asyncio
+import os
+from typing import Awaitable, Callable
+from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+
+from .chat import create_template
+from .dedup import (
+    dedup_stats,
+    find_by_raw_hash,
+    find_by_text_hash,
+    save_ingest_record,
+    template_for,
+    text_fingerprint,
+)
+from .gemini import analyze_document
+from .parser import PARSER_PROCESSES, extract_text_from_path, spool_upload
+
+
+INGEST_MAX_FILES = int(os.getenv("INGEST_MAX_FILES", "200"))
+INGEST_ANALYSIS_CONCURRENCY = int(os.getenv("INGEST_ANALYSIS_CONCURRENCY", "4"))
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "8"))
+
+
+class IngestError(Exception):
+    """`detail` is safe to return to clients; `cause` is the underlying error."""
+
+    def __init__(self, status_code: int, detail: str, cause: Exception):
+        super().__init__(f"{detail}: {cause}")
+        self.status_code = status_code
+        self.detail = detail
+        self.cause = cause
+
+
+class IngestLimits:
+    """Per-batch stage limits: parsing by cores, LLM stages by quota."""
+
+    def __init__(
+        self,
+        parse: int = PARSER_PROCESSES,
+        analysis: int = INGEST_ANALYSIS_CONCURRENCY,
+        embed: int = INGEST_EMBED_CONCURRENCY,
+    ):
+        self.parse = asyncio.Semaphore(parse)
+        self.analysis = asyncio.Semaphore(analysis)
+        self.embed = asyncio.Semaphore(embed)
+
+
+def _deduplicated(template_id: int, analysis: dict) -> dict:
+    return {
+        "template_id": template_id,
+        "detected_variables": len(analysis.get("variables", [])),
+        "deduplicated": True,
+    }
+
+
+async def _no_stage(stage: str):
+    pass
+
+
+async def ingest_upload(
+    file: UploadFile,
+    db: AsyncSession,
+    limits: IngestLimits | None = None,
+    pdf_engine: str | None = None,
+) -> dict:
+    """
+    Extract, analyze and store one upload. Identical bytes, or a different
+    file with the same extracted text, resolve to the existing template
+    without any remote calls. An explicit `pdf_engine` always re-extracts,
+    since the bytes may have been stored from another engine's text.
+
+    Raises IngestError with the HTTP status the stage maps to.
+    """
+    limits = limits or IngestLimits()
+
+    async with limits.parse:
+        try:
+            path, raw_sha256 = await spool_upload(file)
+        except Exception as e:
+            raise IngestError(400, "Failed to extract text from file", e)
+
+    try:
+        return await ingest_spooled(
+            path, file.filename, raw_sha256, db, limits, pdf_engine
+        )
+    finally:
+        os.unlink(path)
+
+
+async def ingest_spooled(
+    path: str,
+    filename: str,
+    raw_sha256: str,
+    db: AsyncSession,
+    limits: IngestLimits | None = None,
+    pdf_engine: str | None = None,
+    on_stage: Callable[[str], Awaitable[None]] = _no_stage,
+) -> dict:
+    """
+    ingest_upload for a file already spooled to `path`, which the caller
+    still owns. `on_stage` is awaited as the upload enters the
+    "extracting", "analyzing" and "storing" stages.
+    """
+    limits = limits or IngestLimits()
+
+    async with limits.parse:
+        try:
+            # Re-uploading with another engine must not return the
+            # template built from the old extraction
+            record = None
+            if pdf_engine is None:
+                record = await db.run_sync(find_by_raw_hash, raw_sha256)
+            if record:
+                dedup_stats.record("raw_hits")
+                return _deduplicated(record.template_id, record.analysis)
+
+            await on_stage("extracting")
+            raw_text = await extract_text_from_path(path, filename, pdf_engine)
+        except Exception as e:
+            raise IngestError(400, "Failed to extract text from file", e)
+
+    text_sha256 = text_fingerprint(raw_text)
+    record = await db.run_sync(find_by_text_hash, text_sha256)
+
+    existing_template_id = await db.run_sync(template_for, record)
+    if existing_template_id is not None:
+        dedup_stats.record("text_hits")
+        await db.run_sync(
+            save_ingest_record,
+            raw_sha256,
+            text_sha256,
+            record.analysis,
+            existing_template_id,
+        )
+        return _deduplicated(existing_template_id, record.analysis)
+
+    if record:
+        # Same text seen before but its template is gone: skip the analysis
+        dedup_stats.record("text_hits")
+        analysis = record.analysis
+    else:
+        dedup_stats.record("misses")
+        await on_stage("analyzing")
+        try:
+            async with limits.analysis:
+                analysis = await analyze_document(raw_text)
+        except Exception as e:
+            raise IngestError(500, "Document analysis failed", e)
+
+    await on_stage("storing")
+    try:
+        async with limits.embed:
+            new_template = await create_template(
+                title=filename, raw_text=raw_text, analysis=analysis, db=db
+            )
+    except Exception as e:
+        await db.rollback()
+        raise IngestError(500, "Failed to store template", e)
+
+    await db.run_sync(
+        save_ingest_record, raw_sha256, text_sha256, analysis, new_template.id
+    )
+
+    return {
+        "template_id": new_template.id,
+        "detected_variables": len(analysis.get("variables", [])),
+        "deduplicated": False,
+    }
+
+
+async def ingest_one(
+    file: UploadFile,
+    limits: IngestLimits,
+    pdf_engine: str | None = None,
+) -> dict:
+    result = {"filename": file.filename}
+
+    # A session can't be shared between concurrently running files
+    async with AsyncSessionLocal() as db:
+        try:
+            stored = await ingest_upload(file, db, limits, pdf_engine)
+        except IngestError as e:
+            # Only the detail is client-safe; the cause stays in the log
+            print(f"Ingest of {file.filename} failed:", e)
+            return {**result, "status": "error", "error": e.detail}
+        except Exception as e:
+            # Other files' templates are already committed, so one
+            # unexpected error must not turn the whole batch into a 500
+            print(f"Ingest of {file.filename} failed:", e)
+            return {**result, "status": "error", "error": "Internal server error"}
+
+    return {**result, "status": "success", **stored}
+
+
+async def ingest_many(
+    files: list[UploadFile], pdf_engine: str | None = None
+) -> list[dict]:
+    limits = IngestLimits()
+    return await asyncio.gather(*(ingest_one(f, limits, pdf_engine) for f in files))
@@ -0,0 +1,327 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import UploadFile
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models import IngestJob
+from .ingest import IngestError, IngestLimits, ingest_spooled
+from .parser import spool_upload
+
+
+# Queued uploads wait here until a worker picks them up, so it has to
+# survive restarts (unlike UPLOAD_SPOOL_DIR)
+INGEST_UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", "./data/uploads")
+# Workers started inside each API process; 0 leaves the queue to
+# `python -m app.worker` processes
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# How often idle workers look for jobs queued by other processes
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "1"))
+# Running jobs refresh their heartbeat this often; one without a heartbeat
+# for INGEST_JOB_TIMEOUT is assumed to belong to a dead worker
+INGEST_HEARTBEAT_SECONDS = float(os.getenv("INGEST_HEARTBEAT_SECONDS", "30"))
+INGEST_JOB_TIMEOUT = int(os.getenv("INGEST_JOB_TIMEOUT", "300"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+
+# Stages in the order a job goes through them, for the progress fraction
+JOB_STAGES = ("queued", "extracting", "analyzing", "storing", "done")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _discard(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+async def enqueue_upload(
+    file: UploadFile, db: AsyncSession, pdf_engine: str | None = None
+) -> IngestJob:
+    """
+    Spool an upload to INGEST_UPLOAD_DIR and queue it. Type and size are
+    checked here so bad uploads are rejected before a job exists.
+    """
+    os.makedirs(INGEST_UPLOAD_DIR, exist_ok=True)
+    try:
+        path, raw_sha256 = await spool_upload(file, INGEST_UPLOAD_DIR)
+    except Exception as e:
+        raise IngestError(400, "Failed to extract text from file", e)
+
+    job = IngestJob(
+        id=uuid.uuid4().hex,
+        status="queued",
+        stage="queued",
+        filename=file.filename,
+        path=path,
+        raw_sha256=raw_sha256,
+        pdf_engine=pdf_engine,
+        attempts=0,
+    )
+    try:
+        db.add(job)
+        await db.commit()
+    except BaseException:
+        _discard(path)
+        raise
+
+    ingest_workers.notify()
+    return job
+
+
+def job_status(job: IngestJob) -> dict:
+    status = {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": round(JOB_STAGES.index(job.stage) / (len(JOB_STAGES) - 1), 2),
+        "filename": job.filename,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == "succeeded":
+        status["result"] = job.result
+    elif job.status == "failed":
+        status["error"] = job.error
+    return status
+
+
+async def claim_next_job(db: AsyncSession, worker_id: str) -> Optional[IngestJob]:
+    """Take the oldest queued job, or None when the queue is empty."""
+    while True:
+        job_id = (
+            await db.execute(
+                select(IngestJob.id)
+                .where(IngestJob.status == "queued")
+                .order_by(IngestJob.created_at, IngestJob.id)
+                .limit(1)
+            )
+        ).scalar()
+        if job_id is None:
+            return None
+
+        # Only one worker's conditional update can match; the others retry
+        claimed = await db.execute(
+            update(IngestJob)
+            .where(IngestJob.id == job_id, IngestJob.status == "queued")
+            .values(
+                status="running",
+                worker=worker_id,
+                attempts=IngestJob.attempts + 1,
+                started_at=_utcnow(),
+                heartbeat_at=_utcnow(),
+            )
+        )
+        await db.commit()
+        if claimed.rowcount == 1:
+            return await db.get(IngestJob, job_id)
+
+
+async def requeue_stale_jobs(db: AsyncSession, worker_id: str | None = None) -> int:
+    """
+    Put jobs left running by a dead worker back in the queue, or fail them
+    once they have used up INGEST_MAX_ATTEMPTS. With `worker_id`, only that
+    worker's jobs are released, however recent their heartbeat.
+    """
+    stale = [IngestJob.status == "running"]
+    if worker_id:
+        stale.append(IngestJob.worker == worker_id)
+    else:
+        cutoff = _utcnow() - timedelta(seconds=INGEST_JOB_TIMEOUT)
+        stale.append(
+            func.coalesce(IngestJob.heartbeat_at, IngestJob.started_at) < cutoff
+        )
+
+    jobs = (
+        await db.execute(
+            select(IngestJob.id, IngestJob.path, IngestJob.attempts).where(*stale)
+        )
+    ).all()
+
+    released, exhausted = 0, []
+    for job in jobs:
+        if job.attempts >= INGEST_MAX_ATTEMPTS:
+            values = {
+                "status": "failed",
+                "error": "Worker stopped before the job finished",
+                "finished_at": _utcnow(),
+            }
+        else:
+            values = {"status": "queued", "stage": "queued", "worker": None}
+
+        # Re-checked in the update, so a heartbeat that lands in between wins
+        changed = await db.execute(
+            update(IngestJob).where(IngestJob.id == job.id, *stale).values(**values)
+        )
+        if changed.rowcount == 1:
+            released += 1
+            if values["status"] == "failed":
+                exhausted.append(job.path)
+    await db.commit()
+
+    for path in exhausted:
+        _discard(path)
+    return released
+
+
+def _owned(job: IngestJob):
+    """Updates to a running job only apply while its worker still owns it."""
+    return update(IngestJob).where(
+        IngestJob.id == job.id,
+        IngestJob.worker == job.worker,
+        IngestJob.status == "running",
+    )
+
+
+async def _touch(job: IngestJob, **values) -> bool:
+    async with AsyncSessionLocal() as db:
+        touched = await db.execute(
+            _owned(job).values(heartbeat_at=_utcnow(), **values)
+        )
+        await db.commit()
+    return touched.rowcount == 1
+
+
+async def _heartbeat(job: IngestJob):
+    while True:
+        await asyncio.sleep(INGEST_HEARTBEAT_SECONDS)
+        try:
+            if not await _touch(job):
+                print(f"Ingest job {job.id} was reclaimed from this worker")
+                return
+        except Exception as e:
+            print(f"Ingest job {job.id} heartbeat failed:", e)
+
+
+async def _set_stage(job: IngestJob, stage: str):
+    await _touch(job, stage=stage)
+
+
+async def _finish(job: IngestJob, result: dict | None = None, error: str | None = None):
+    async with AsyncSessionLocal() as db:
+        finished = await db.execute(
+            _owned(job).values(
+                status="failed" if error else "succeeded",
+                stage="done",
+                result=result,
+                error=error,
+                finished_at=_utcnow(),
+            )
+        )
+        await db.commit()
+
+    # A job reclaimed while this worker was stalled belongs to its new
+    # worker now, spooled file included
+    if finished.rowcount == 1:
+        _discard(job.path)
+    else:
+        print(f"Ingest job {job.id} was reclaimed; dropping this worker's outcome")
+
+
+async def run_job(job: IngestJob, limits: IngestLimits):
+    heartbeat = asyncio.create_task(_heartbeat(job))
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await ingest_spooled(
+                job.path,
+                job.filename,
+                job.raw_sha256,
+                db,
+                limits,
+                job.pdf_engine,
+                on_stage=lambda stage: _set_stage(job, stage),
+            )
+    except IngestError as e:
+        print(f"Ingest job {job.id} failed:", e)
+        await _finish(job, error=e.detail)
+        return
+    except Exception as e:
+        print(f"Ingest job {job.id} failed:", e)
+        await _finish(job, error="Internal server error")
+        return
+    finally:
+        heartbeat.cancel()
+
+    await _finish(job, result=result)
+
+
+class IngestWorkerPool:
+    """
+    `workers` concurrent job loops sharing one set of IngestLimits, so
+    parsing and LLM stages stay bounded however many jobs are running.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, poll_seconds: float = INGEST_POLL_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._swept_at = 0.0
+
+    def start(self):
+        if self._tasks or self.workers <= 0:
+            return
+        limits = IngestLimits()
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(limits)) for _ in range(self.workers)
+        ]
+        print(f"Started {self.workers} ingest workers ({self.worker_id})")
+
+    def notify(self):
+        """Wake idle workers in this process right away instead of at the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._tasks:
+            # Interrupted jobs go straight back to the queue
+            async with AsyncSessionLocal() as db:
+                await requeue_stale_jobs(db, worker_id=self.worker_id)
+        self._tasks = []
+        self._wakeup = None
+
+    async def _run(self, limits: IngestLimits):
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    if time.monotonic() - self._swept_at > INGEST_JOB_TIMEOUT / 10:
+                        self._swept_at = time.monotonic()
+                        await requeue_stale_jobs(db)
+                    job = await claim_next_job(db, self.worker_id)
+
+                if job is None:
+                    await self._idle()
+                else:
+                    await run_job(job, limits)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("Ingest worker error:", e)
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _idle(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+ingest_workers = IngestWorkerPool()
@@ -0,0 +1,149 @@
+import google.genai as genai
+from google.genai import errors as genai_errors
+import asyncio
+import httpx
+import os
+from typing import AsyncIterator
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+
+API_KEY = os.getenv("GOOGLE_API_KEY", "").strip()
+print("API key length:", len(os.getenv("GOOGLE_API_KEY", "")))
+if not API_KEY:
+    raise RuntimeError("GOOGLE_API_KEY environment variable not set")
+
+client = genai.Client(api_key=API_KEY)
+
+DEFAULT_MODEL = "gemini-2.5-flash-lite"
+EMBEDDING_MODEL = "gemini-embedding-001"
+
+# The embedding API accepts at most 100 texts per request
+EMBED_BATCH_SIZE = min(int(os.getenv("EMBED_BATCH_SIZE", "100")), 100)
+EMBED_BATCH_CONCURRENCY = int(os.getenv("EMBED_BATCH_CONCURRENCY", "4"))
+EMBED_MAX_CHARS = 8000
+
+# Upper bound on in-flight Gemini calls per worker; requests beyond it
+# wait here instead of piling up on the API's rate limits.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+_semaphore: asyncio.Semaphore | None = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def generate_json(
+    prompt: str,
+    model: str = DEFAULT_MODEL,
+    response_schema=None,
+) -> str:
+    """
+    Run a temperature-0 JSON generation on the SDK's async client and
+    return the raw response text. Never blocks the event loop.
+    """
+    config = {
+        "temperature": 0,
+        "response_mime_type": "application/json",
+    }
+    if response_schema is not None:
+        config["response_schema"] = response_schema
+
+    async with _get_semaphore():
+        response = await client.aio.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=config,
+        )
+
+    return response.text
+
+
+async def generate_json_stream(
+    prompt: str, model: str = DEFAULT_MODEL
+) -> AsyncIterator[str]:
+    """generate_json, yielding the response text in chunks as it is produced."""
+    config = {
+        "temperature": 0,
+        "response_mime_type": "application/json",
+    }
+
+    async with _get_semaphore():
+        stream = await client.aio.models.generate_content_stream(
+            model=model,
+            contents=prompt,
+            config=config,
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+
+async def embed_content(contents, model: str = EMBEDDING_MODEL) -> list[list[float]]:
+    async with _get_semaphore():
+        response = await client.aio.models.embed_content(
+            model=model,
+            contents=contents,
+        )
+
+    if not response.embeddings:
+        raise ValueError("No embeddings returned from Gemini")
+
+    return [e.values for e in response.embeddings]
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying."""
+    if isinstance(error, genai_errors.ServerError):
+        return True
+    if isinstance(error, genai_errors.ClientError):
+        return error.code == 429
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+@retry(
+    retry=retry_if_exception(is_transient_error),
+    stop=stop_after_attempt(5),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    reraise=True,
+)
+async def _embed_batch(texts: list[str], model: str) -> list[list[float]]:
+    embeddings = await embed_content(texts, model=model)
+    if len(embeddings) != len(texts):
+        raise ValueError(
+            f"Expected {len(texts)} embeddings from Gemini, got {len(embeddings)}"
+        )
+    return embeddings
+
+
+async def embed_many(
+    texts: list[str],
+    model: str = EMBEDDING_MODEL,
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = EMBED_BATCH_CONCURRENCY,
+) -> list[list[float]]:
+    """
+    Embed any number of texts in order, `batch_size` per request with at most
+    `concurrency` requests in flight; transient failures are retried with
+    backoff per batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = [
+        [t[:EMBED_MAX_CHARS] for t in texts[i : i + batch_size]]
+        for i in range(0, len(texts), batch_size)
+    ]
+
+    async def run(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            return await _embed_batch(batch, model)
+
+    results = await asyncio.gather(*(run(batch) for batch in batches))
+    return [embedding for batch in results for embedding in batch]
@@ -1,17 +1,278 @@
 import pdfplumber
-from docx import Document
-import io
+import pypdfium2 as pdfium
+from lxml import etree
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
 
-async def extract_text_from_file(file):
-    content = await file.read()
-    extension = file.filename.split(".")[-1].lower()
+PARSER_PROCESSES = int(os.getenv("PARSER_PROCESSES", str(os.cpu_count() or 1)))
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "50"))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "1000"))
+# PDFs longer than this are split into page ranges parsed in parallel
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "25"))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+# "auto" tries the fast pdfium text layer first and falls back to
+# pdfplumber's layout analysis when the result is empty or garbled
+PDF_ENGINES = ("auto", "pdfium", "pdfplumber")
+PDF_ENGINE = os.getenv("PDF_ENGINE", "auto")
+if PDF_ENGINE not in PDF_ENGINES:
+    raise RuntimeError(f"PDF_ENGINE must be one of {', '.join(PDF_ENGINES)}")
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PARSER_PROCESSES)
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+def file_extension(filename: str) -> str:
+    return filename.split(".")[-1].lower()
+
+
+# ---------- worker-process functions (must stay picklable) ----------
+
+
+def count_pdf_pages(path: str) -> int:
+    pdf = pdfium.PdfDocument(path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def extract_pdf_pages_pdfplumber(path: str, start: int, end: int) -> str:
+    with pdfplumber.open(path, pages=list(range(start + 1, end + 1))) as pdf:
+        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+
+def extract_pdf_pages_pdfium(path: str, start: int, end: int) -> str:
+    pdf = pdfium.PdfDocument(path)
+    try:
+        parts = []
+        for index in range(start, end):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            try:
+                parts.append(textpage.get_text_bounded())
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+    return "\n".join(parts).replace("\r\n", "\n").replace("\r", "\n")
+
+
+def text_looks_poor(text: str) -> bool:
+    """
+    Empty output (scanned or image-only pages) or output dominated by
+    replacement and control characters (broken font encodings).
+    """
+    visible = [ch for ch in text if not ch.isspace()]
+    if not visible:
+        return True
+
+    readable = sum(1 for ch in visible if ch.isprintable() and ch != "\ufffd")
+    return readable / len(visible) < 0.9
+
+
+def extract_pdf_pages(path: str, start: int, end: int, engine: str = "auto") -> str:
+    if engine == "pdfplumber":
+        return extract_pdf_pages_pdfplumber(path, start, end)
+
+    text = extract_pdf_pages_pdfium(path, start, end)
+    if engine == "auto" and text_looks_poor(text):
+        return extract_pdf_pages_pdfplumber(path, start, end)
+
+    return text
+
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DOCX_PART_PATTERN = re.compile(r"word/(header|footer)\d*\.xml")
+
+
+def _paragraph_text(paragraph) -> str:
+    parts = []
+    for node in paragraph.iter(f"{W_NS}t", f"{W_NS}tab", f"{W_NS}br", f"{W_NS}cr"):
+        if node.tag == f"{W_NS}t":
+            parts.append(node.text or "")
+        elif node.tag == f"{W_NS}tab":
+            parts.append("\t")
+        else:
+            parts.append("\n")
+    return "".join(parts)
+
+
+def iter_docx_part(stream):
+    """
+    Yield one line per body paragraph and per table row of a WordprocessingML
+    part, streaming with iterparse and discarding each element once read.
+    Table cells are joined with " | ".
+    """
+    cells: list[list[str]] = []
+    rows: list[list[str]] = []
+
+    for event, elem in etree.iterparse(
+        stream,
+        events=("start", "end"),
+        tag=(f"{W_NS}p", f"{W_NS}tc", f"{W_NS}tr"),
+    ):
+        if event == "start":
+            if elem.tag == f"{W_NS}tr":
+                rows.append([])
+            elif elem.tag == f"{W_NS}tc":
+                cells.append([])
+            continue
+
+        if elem.tag == f"{W_NS}p":
+            text = _paragraph_text(elem)
+            if cells:
+                cells[-1].append(text)
+            else:
+                yield text
+        elif elem.tag == f"{W_NS}tc":
+            cell = " ".join(t for t in cells.pop() if t)
+            if rows:
+                rows[-1].append(cell)
+        else:
+            line = " | ".join(rows.pop())
+            if cells:
+                # Nested table: the row becomes part of the enclosing cell
+                cells[-1].append(line)
+            else:
+                yield line
+
+        # Only finished paragraphs/rows are cleared, so open ancestors keep
+        # their place while the document's earlier content is released
+        if not cells and not rows:
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+
+def extract_docx(path: str) -> str:
+    """Headers, then body (paragraphs and tables), then footers."""
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        headers = sorted(
+            n for n in names
+            if DOCX_PART_PATTERN.fullmatch(n) and "header" in n
+        )
+        footers = sorted(
+            n for n in names
+            if DOCX_PART_PATTERN.fullmatch(n) and "footer" in n
+        )
+
+        lines, seen_parts = [], set()
+        for name in headers + ["word/document.xml"] + footers:
+            with archive.open(name) as stream:
+                part_lines = list(iter_docx_part(stream))
+
+            # First-page/even-page variants often repeat the same text
+            key = "\n".join(part_lines)
+            if name != "word/document.xml" and (not key.strip() or key in seen_parts):
+                continue
+            seen_parts.add(key)
+            lines.extend(part_lines)
+
+    return "\n".join(lines)
+
+
+# ---------- event-loop side ----------
+
+
+def _spool_upload(
+    source, max_bytes: int, directory: str | None = UPLOAD_SPOOL_DIR
+) -> tuple[str, str]:
+    """
+    Copy an upload to a temp file in chunks, enforcing the size cap.
+    Returns (path, sha256 hex digest of the raw bytes).
+    """
+    written = 0
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as spool:
+        try:
+            while chunk := source.read(SPOOL_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ValueError(
+                        f"File exceeds the {MAX_UPLOAD_MB:g} MB upload limit"
+                    )
+                digest.update(chunk)
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            os.unlink(spool.name)
+            raise
+    return spool.name, digest.hexdigest()
+
+
+async def spool_upload(file, directory: str | None = UPLOAD_SPOOL_DIR) -> tuple[str, str]:
+    """
+    Spool an UploadFile to disk off the event loop. The caller owns the
+    returned path and must unlink it.
+    """
+    if file_extension(file.filename) not in ("pdf", "docx"):
+        raise ValueError("Unsupported file type. Please upload PDF or DOCX.")
+
+    await file.seek(0)
+    return await asyncio.to_thread(
+        _spool_upload, file.file, int(MAX_UPLOAD_MB * 1024 * 1024), directory
+    )
+
+
+async def extract_text_from_path(
+    path: str, filename: str, pdf_engine: str | None = None
+) -> str:
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    extension = file_extension(filename)
 
     if extension == "pdf":
-        with pdfplumber.open(io.BytesIO(content)) as pdf:
-            return "\n".join(page.extract_text() or "" for page in pdf.pages)
+        page_count = await loop.run_in_executor(pool, count_pdf_pages, path)
+        if page_count > MAX_PDF_PAGES:
+            raise ValueError(f"PDF exceeds the {MAX_PDF_PAGES} page limit")
+
+        ranges = [
+            (start, min(start + PDF_PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)
+        ]
+        parts = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    pool, extract_pdf_pages, path, start, end, pdf_engine or PDF_ENGINE
+                )
+                for start, end in ranges
+            )
+        )
+        return "\n".join(parts)
     elif extension == "docx":
-        doc = Document(io.BytesIO(content))
-        return "\n".join(p.text for p in doc.paragraphs)
+        return await loop.run_in_executor(pool, extract_docx, path)
 
     raise ValueError("Unsupported file type. Please upload PDF or DOCX.")
+
+
+async def extract_text_from_file(file, pdf_engine: str | None = None):
+    path, _ = await spool_upload(file)
+    try:
+        return await extract_text_from_path(path, file.filename, pdf_engine)
+    finally:
+        os.unlink(path)
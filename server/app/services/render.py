@@ -0,0 +1,115 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator
+
+from app.models import Template
+from .cache import TTLCache, MISSING
+
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{([^{}\s]+)\}\}")
+
+
+@dataclass
+class CompiledTemplate:
+    """
+    Template body split once into alternating literals and placeholder keys:
+    literals[0], keys[0], literals[1], keys[1], ..., literals[-1]
+    """
+
+    literals: list[str]
+    keys: list[str]
+    placeholders: frozenset = field(init=False)
+
+    def __post_init__(self):
+        self.placeholders = frozenset(self.keys)
+
+    def segments(self, values: Dict[str, str]) -> Iterator[str]:
+        # Values are emitted verbatim, so a value containing "{{other}}" is
+        # never expanded again; unfilled placeholders are kept as written.
+        literals = self.literals
+        for i, key in enumerate(self.keys):
+            yield literals[i]
+            value = values.get(key)
+            yield f"{{{{{key}}}}}" if value is None else value
+        yield literals[-1]
+
+
+@dataclass
+class RenderResult:
+    output: str
+    unknown: list[str]
+    unfilled: list[str]
+
+
+def compile_body(body: str) -> CompiledTemplate:
+    literals, keys = [], []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(body):
+        literals.append(body[position : match.start()])
+        keys.append(match.group(1))
+        position = match.end()
+    literals.append(body[position:])
+    return CompiledTemplate(literals=literals, keys=keys)
+
+
+compiled_templates = TTLCache("compiled_templates", maxsize=512, ttl=86400)
+
+
+def _cache_key(template: Template) -> str:
+    return f"{template.id}:{template.version}"
+
+
+def get_compiled(template: Template) -> CompiledTemplate:
+    cache_key = _cache_key(template)
+
+    compiled = compiled_templates.get(cache_key)
+    if compiled is MISSING:
+        compiled = compile_body(template.body or "")
+        compiled_templates.set(cache_key, compiled)
+
+    return compiled
+
+
+async def load_compiled(template: Template) -> CompiledTemplate:
+    """
+    get_compiled for templates from an AsyncSession: the deferred body is
+    only fetched, with an await, on a cache miss.
+    """
+    cache_key = _cache_key(template)
+
+    compiled = compiled_templates.get(cache_key)
+    if compiled is MISSING:
+        compiled = compile_body(await template.awaitable_attrs.body or "")
+        compiled_templates.set(cache_key, compiled)
+
+    return compiled
+
+
+def render_compiled(compiled: CompiledTemplate, values: Dict[str, str]) -> RenderResult:
+    return RenderResult(
+        output="".join(compiled.segments(values)),
+        unknown=[k for k in values if k not in compiled.placeholders],
+        unfilled=sorted(k for k in compiled.placeholders if values.get(k) is None),
+    )
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def stream_rendered(
+    compiled: CompiledTemplate, values: Dict[str, str], chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Yield the rendered document as UTF-8 chunks of roughly `chunk_size`
+    characters, so memory per request stays flat regardless of document size.
+    """
+    buffer, buffered = [], 0
+    for segment in compiled.segments(values):
+        buffer.append(segment)
+        buffered += len(segment)
+        if buffered >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer, buffered = [], 0
+
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
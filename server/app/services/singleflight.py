@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable
+
+from .cache import CACHE_REGISTRY
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one in-flight task.
+    The first caller starts `fn()`; callers arriving before it finishes
+    await the same result (or exception). Nothing is kept afterwards.
+
+    The shared task is shielded, so a caller that is cancelled (e.g. its
+    client disconnected) does not cancel the work for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.joined = 0
+
+        CACHE_REGISTRY[name] = self
+
+    def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+        # Registration happens here, synchronously, so two callers in the
+        # same loop tick can never both become leaders
+        with self._lock:
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(fn())
+                self._inflight[key] = task
+                task.add_done_callback(lambda done: self._forget(key, done))
+                self.leaders += 1
+            else:
+                self.joined += 1
+
+        return asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        with self._lock:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self.leaders + self.joined
+            return {
+                "in_flight": len(self._inflight),
+                "leaders": self.leaders,
+                "joined": self.joined,
+                "coalesced_rate": round(self.joined / calls, 4) if calls else 0.0,
+            }
@@ -0,0 +1,141 @@
+import re
+from typing import Dict, Iterable, Optional
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Compile literals into one trie-shaped regex, e.g. ["acme corp", "acme inc"]
+    becomes "acme\\ (?:corp|inc)". Optional tails are greedy, so the longest
+    literal that fits wins, and each position is scanned once instead of once
+    per literal.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    # Post-order walk with an explicit stack: recursing once per character
+    # overflows on clause-length examples
+    regex: dict[int, str] = {}
+    stack = [(trie, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for ch, child in node.items() if ch != "")
+            continue
+
+        branches = [
+            re.escape(ch) + regex.pop(id(child))
+            for ch, child in sorted(node.items())
+            if ch != ""
+        ]
+        if not branches:
+            regex[id(node)] = ""
+        elif len(branches) == 1 and "" not in node:
+            regex[id(node)] = branches[0]
+        else:
+            body = "(?:" + "|".join(branches) + ")"
+            regex[id(node)] = body + "?" if "" in node else body
+
+    return regex[id(trie)]
+
+
+def _pattern_literal(example: str) -> str:
+    """
+    Lowercase per character for the trie, so examples differing only in case
+    share branches. Unlike casefold this never changes the length: "ß" stays
+    "ß" and still matches the original text under re.IGNORECASE.
+    """
+    return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in example)
+
+
+def _alternation_pattern(words: Iterable[str]) -> str:
+    """Plain alternation, longest first so the longest literal still wins."""
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+class Templatizer:
+    """
+    Replaces variable example values with {{key}} placeholders in a single
+    pass over the text.
+
+    - Values: every example of at least two characters, matched
+      case-insensitively as a whole word; overlapping examples resolve to
+      the longest, duplicate examples to the first variable.
+    - Signatures: "Name: <example>" becomes "Name: {{key}}" for every
+      example (optionally only for `signature_keys`).
+    """
+
+    def __init__(
+        self,
+        variables: list[Dict],
+        replace_values: bool = True,
+        signature_keys: Optional[Iterable[str]] = None,
+    ):
+        if signature_keys is not None:
+            signature_keys = set(signature_keys)
+
+        # Keyed by casefold for looking up matched text; the patterns are
+        # built from the examples themselves
+        self._value_keys: dict[str, str] = {}
+        self._signature_keys: dict[str, str] = {}
+        self._value_literals: dict[str, None] = {}
+        self._signature_literals: dict[str, None] = {}
+
+        for var in variables:
+            key = var.get("key")
+            example = var.get("example") or ""
+            if not key or not example:
+                continue
+
+            folded = example.casefold()
+            literal = _pattern_literal(example)
+            if replace_values and len(example.strip()) >= 2:
+                self._value_keys.setdefault(folded, key)
+                self._value_literals.setdefault(literal)
+            if signature_keys is None or key in signature_keys:
+                self._signature_keys.setdefault(folded, key)
+                self._signature_literals.setdefault(literal)
+
+        try:
+            self._pattern = self._compile(_trie_pattern)
+        except RecursionError:
+            # Hundreds of nested optional groups (many examples that are
+            # prefixes of each other) are too deep for the regex compiler
+            self._pattern = self._compile(_alternation_pattern)
+
+    def _compile(self, literals) -> Optional[re.Pattern]:
+        branches = []
+        if self._signature_literals:
+            branches.append(
+                r"(?P<sig>Name:\s*)(?P<sigval>"
+                + literals(self._signature_literals)
+                + r")(?!\w)"
+            )
+        if self._value_literals:
+            branches.append(
+                r"(?<!\w)(?P<val>" + literals(self._value_literals) + r")(?!\w)"
+            )
+
+        return re.compile("|".join(branches), re.IGNORECASE) if branches else None
+
+    def _replace(self, match: re.Match) -> str:
+        if match.group("sig") is not None:
+            key = self._signature_keys.get(match.group("sigval").casefold())
+            if key is None:
+                return match.group(0)
+            return f"Name: {{{{{key}}}}}"
+
+        key = self._value_keys.get(match.group("val").casefold())
+        if key is None:
+            return match.group(0)
+        return f"{{{{{key}}}}}"
+
+    def apply(self, text: str) -> tuple[str, int]:
+        """Returns (templated_text, replacements_made)."""
+        if self._pattern is None or not text:
+            return text, 0
+        return self._pattern.subn(self._replace, text)
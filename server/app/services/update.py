@@ -1,7 +1,8 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 from app.database import SessionLocal
 from app.models import Template
-import re
+from app.services.index import template_index
+from app.services.templatize import Templatizer
 
 SIGNATURE_KEYS = {
     "disclosing_party_name": "{{disclosing_party_name}}",
@@ -15,7 +16,7 @@ def update_existing_templates():
     total_replacements = 0
 
     try:
-        templates = db.query(Template).all()
+        templates = db.query(Template).options(undefer(Template.body)).all()
 
         for tpl in templates:
             if not tpl.body or not tpl.variables:
@@ -25,30 +26,20 @@ def update_existing_templates():
                 continue
 
             original_body = tpl.body
-            body = original_body
-            replacements_in_template = 0
-
-            for var in tpl.variables:
-                key = var.get("key")
-                example = var.get("example", "")
-
-                if key in SIGNATURE_KEYS and example:
-                    pattern = rf"Name:\s*{re.escape(example)}\b"
-                    body, count = re.subn(
-                        pattern,
-                        f"Name: {SIGNATURE_KEYS[key]}",
-                        body,
-                        flags=re.IGNORECASE,
-                    )
-                    replacements_in_template += count
+            body, replacements_in_template = Templatizer(
+                tpl.variables, replace_values=False, signature_keys=SIGNATURE_KEYS
+            ).apply(original_body)
 
             if body != original_body:
                 tpl.body = body
+                tpl.version = (tpl.version or 1) + 1
                 db.add(tpl)
                 updated_templates += 1
                 total_replacements += replacements_in_template
 
         db.commit()
+        if updated_templates:
+            template_index.invalidate()
 
         print(
             f"Template update complete: "
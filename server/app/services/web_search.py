@@ -1,5 +1,51 @@
 import httpx
 import os
+from .cache import TTLCache, MISSING, normalize_query
+
+
+EXA_BASE_URL = os.getenv("EXA_BASE_URL", "https://api.exa.ai").rstrip("/")
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "30"))
+WEB_SEARCH_MAX_CONNECTIONS = int(os.getenv("WEB_SEARCH_MAX_CONNECTIONS", "20"))
+
+# Searches for the same document title return the same pages, so results
+# are cached; "nothing found" is cached too, for a shorter time
+web_search_cache = TTLCache(
+    "web_search",
+    maxsize=int(os.getenv("WEB_SEARCH_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("WEB_SEARCH_CACHE_TTL", "86400")),
+    disk_path=os.getenv("WEB_SEARCH_CACHE_PATH") or None,
+    disk_maxsize=int(os.getenv("WEB_SEARCH_CACHE_DISK_SIZE", "20000")),
+)
+WEB_SEARCH_NEGATIVE_TTL = float(os.getenv("WEB_SEARCH_NEGATIVE_TTL", "600"))
+WEB_SEARCH_RESULTS = int(os.getenv("WEB_SEARCH_RESULTS", "5"))
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    One keep-alive HTTP/2 client per process, so repeat searches reuse the
+    open TLS connection instead of handshaking on every call.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=WEB_SEARCH_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=WEB_SEARCH_MAX_CONNECTIONS,
+                max_keepalive_connections=WEB_SEARCH_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 def safe_truncate(text: str, max_chars: int = 3000) -> str:
@@ -8,50 +54,60 @@ def safe_truncate(text: str, max_chars: int = 3000) -> str:
     return text[:max_chars].rsplit(" ", 1)[0]
 
 
-async def search_template_on_web(query: str):
+async def search_template_on_web(query: str) -> list[dict]:
+    """
+    Candidate source documents for `query`, best first, as
+    [{"title", "raw_text"}]. Empty when the search finds nothing usable.
+    """
 
     EXA_API_KEY = os.getenv("EXA_API_KEY")
     if not EXA_API_KEY:
         raise RuntimeError("EXA_API_KEY not set")
 
+    cache_key = normalize_query(query)
+    cached = await web_search_cache.aget(cache_key)
+    if cached is not MISSING:
+        return cached
+
     search_query = f"{query} legal document example"
 
     payload = {
         "query": search_query,
         "useAutoprompt": True,
-        "numResults": 5,
+        "numResults": WEB_SEARCH_RESULTS,
         "contents": {"text": True},
     }
     try:
-
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                "https://api.exa.ai/search",
-                json=payload,
-                headers={
-                    "x-api-key": EXA_API_KEY,
-                    "Content-Type": "application/json",
-                },
-            )
-            response.raise_for_status()
+        response = await get_http_client().post(
+            f"{EXA_BASE_URL}/search",
+            json=payload,
+            headers={
+                "x-api-key": EXA_API_KEY,
+                "Content-Type": "application/json",
+            },
+        )
+        response.raise_for_status()
     except Exception as e:
         raise RuntimeError(f"Web search failed: {e}")
 
     data = response.json()
     results = data.get("results", [])
 
-    if not results:
-        return None
-
-    # Use the top result
-    top = results[0]
-    raw_text = top.get("text", "")
-    title = top.get("title", query)
-
-    return {
-        "title": top.get("title", query),
-        "raw_text": safe_truncate(top.get("text", "")),
-    }
+    candidates = [
+        {
+            "title": r.get("title") or query,
+            "raw_text": safe_truncate(r.get("text") or ""),
+        }
+        for r in results
+        if (r.get("text") or "").strip()
+    ]
+
+    if not candidates:
+        await web_search_cache.aset(cache_key, [], ttl=WEB_SEARCH_NEGATIVE_TTL)
+        return []
+
+    await web_search_cache.aset(cache_key, candidates)
+    return candidates
 
 
 def build_template_extraction_prompt(title: str, raw_text: str) -> str:
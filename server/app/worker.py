@@ -0,0 +1,43 @@
+import argparse
+import asyncio
+from app.database import Base, async_engine, engine
+from app.migrate import add_missing_columns
+from app.services.index import template_index
+from app.services.jobs import INGEST_WORKERS, IngestWorkerPool
+from app.services.parser import shutdown_process_pool
+
+
+async def serve(workers: int):
+    pool = IngestWorkerPool(workers)
+    pool.start()
+    try:
+        # Runs until interrupted; the pool requeues whatever it was working on
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+        template_index.flush()
+        shutdown_process_pool()
+        await async_engine.dispose()
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Process queued ingest jobs")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(INGEST_WORKERS, 1),
+        help="jobs processed concurrently by this process",
+    )
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+
+    try:
+        asyncio.run(serve(args.workers))
+    except KeyboardInterrupt:
+        print("Ingest worker stopped")
+
+
+if __name__ == "__main__":
+    run()
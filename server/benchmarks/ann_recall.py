@@ -0,0 +1,114 @@
+"""
+Recall vs latency of the IVF template index against the exact scan.
+
+Run from the server directory:
+    python -m benchmarks.ann_recall --size 100000 --dim 768
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+
+from app.services.index import IVFTemplateIndex, TemplateIndex, normalize_rows
+
+
+def synthetic_library(size: int, dim: int, topics: int, seed: int = 0):
+    # Templates cluster around document types, like real contract libraries
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size)
+    noise = rng.standard_normal((size, dim)).astype(np.float32)
+    return normalize_rows(centers[labels] + 0.6 * noise)
+
+
+def build(index: TemplateIndex, matrix: np.ndarray) -> float:
+    ids = list(range(1, len(matrix) + 1))
+    meta = [{"title": f"Template {i}", "tags": []} for i in ids]
+    start = time.perf_counter()
+    index.set_rows(ids, meta, matrix)
+    return time.perf_counter() - start
+
+
+def timed_search(index: TemplateIndex, queries: np.ndarray, k: int):
+    results = []
+    start = time.perf_counter()
+    for q in queries:
+        results.append([c["id"] for c in index.search(q, k)])
+    elapsed = time.perf_counter() - start
+    return results, elapsed / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--json", action="store_true", help="print JSON only")
+    args = parser.parse_args()
+
+    matrix = synthetic_library(args.size, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    picks = rng.choice(args.size, args.queries, replace=False)
+    queries = matrix[picks] + 0.3 * rng.standard_normal(
+        (args.queries, args.dim)
+    ).astype(np.float32)
+
+    exact = TemplateIndex()
+    build(exact, matrix)
+    truth, exact_ms = timed_search(exact, queries, args.k)
+
+    report = {
+        "size": args.size,
+        "dim": args.dim,
+        "k": args.k,
+        "exact_ms_per_query": round(exact_ms, 3),
+        "ivf": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.ivf.npz")
+        ivf = IVFTemplateIndex(path, min_train_size=1)
+        train_s = build(ivf, matrix)
+
+        reload_s = build(IVFTemplateIndex(path, min_train_size=1), matrix)
+        report["ivf_train_s"] = round(train_s, 3)
+        report["ivf_reload_s"] = round(reload_s, 3)
+
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            found, ms = timed_search(ivf, queries, args.k)
+            hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+            report["ivf"].append(
+                {
+                    "nprobe": nprobe,
+                    "recall": round(hits / (len(truth) * args.k), 4),
+                    "ms_per_query": round(ms, 3),
+                    "speedup": round(exact_ms / ms, 2) if ms else None,
+                }
+            )
+
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(
+        f"{args.size} templates x {args.dim} dims, exact scan "
+        f"{report['exact_ms_per_query']} ms/query"
+    )
+    print(f"IVF train {report['ivf_train_s']} s, reload {report['ivf_reload_s']} s")
+    print(f"{'nprobe':>7} {'recall@' + str(args.k):>9} {'ms/query':>9} {'speedup':>8}")
+    for row in report["ivf"]:
+        print(
+            f"{row['nprobe']:>7} {row['recall']:>9} "
+            f"{row['ms_per_query']:>9} {row['speedup']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Per-request database work of template matching: loading every full row
+(the original start-draft) against the resident catalog plus one by-id
+lookup with the body deferred. Reports SQL statements, wall time and
+Python allocations per request.
+
+Run from the server directory:
+    python -m benchmarks.catalog --templates 500 2000 --body-kb 40
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fakes import fake_embedding
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import undefer
+
+from app.database import Base, SessionLocal, engine
+from app.models import Template
+from app.services.index import TemplateIndex
+
+DIM = 768
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def populate(count: int, body_kb: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    body = "This Agreement is made between {{party_a}} and {{party_b}}. " * (
+        body_kb * 1024 // 60
+    )
+    variables = [{"key": f"var_{i}", "label": f"Var {i}", "example": ""} for i in range(12)]
+
+    db = SessionLocal()
+    try:
+        db.add_all(
+            Template(
+                title=f"Template {i}",
+                body=body,
+                variables=variables,
+                tags=["agreement", f"tag{i % 50}"],
+                embedding=fake_embedding(f"template {i}", DIM),
+            )
+            for i in range(count)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def full_scan_request(query: np.ndarray):
+    db = SessionLocal()
+    try:
+        templates = db.query(Template).options(undefer(Template.body)).all()
+        scores = [
+            (float(np.dot(query, np.asarray(t.embedding))), t)
+            for t in templates
+        ]
+        best = max(scores, key=lambda s: s[0])[1]
+        return best.variables
+    finally:
+        db.close()
+
+
+def catalog_request(index: TemplateIndex, query: np.ndarray):
+    db = SessionLocal()
+    try:
+        index.ensure_loaded(db)
+        best = index.search(query, k=3)[0]
+        return db.get(Template, best["id"]).variables
+    finally:
+        db.close()
+
+
+def measure(fn, repeat: int) -> dict:
+    global statements
+    fn()  # warm up: first catalog load, connection pool
+
+    statements = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mean_ms": round(elapsed, 2),
+        "sql_statements_per_request": round(statements / repeat, 2),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def run(template_counts: list[int], body_kb: int, repeat: int) -> list[dict]:
+    query = np.asarray(fake_embedding("mutual nda", DIM), dtype=np.float32)
+    results = []
+    for count in template_counts:
+        populate(count, body_kb)
+        index = TemplateIndex()
+        results.append(
+            {
+                "templates": count,
+                "body_kb": body_kb,
+                "full_rows": measure(lambda: full_scan_request(query), repeat),
+                "catalog": measure(lambda: catalog_request(index, query), repeat),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--templates", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--body-kb", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.templates, args.body_kb, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
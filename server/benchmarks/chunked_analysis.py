@@ -0,0 +1,81 @@
+"""
+Wall time of analyze_document on long documents: one prompt with the whole
+text against the section-chunked concurrent mode, using a fake Gemini client
+whose latency grows with prompt length. Before timing, the chunking is
+checked to rejoin to the original text, oversized paragraphs included.
+
+Run from the server directory:
+    python -m benchmarks.chunked_analysis --lines 2000 20000 --ms-per-kchar 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.fakes import install_fake_gemini
+from benchmarks.fixtures import legal_lines
+from app.services.gemini import analyze_chunk, analyze_document, split_sections
+
+
+def check_split_sections(chunk_chars: int):
+    """Chunks must rejoin to the input, including oversized paragraphs mid-text."""
+    clause = "The Provider shall deliver the services as agreed.\n"
+    repeats = chunk_chars // len(clause) + 200
+    samples = [
+        "Terms of service\n" + clause * repeats + "\n" + "Signed.",
+        "Terms\n\n" + clause * repeats + "\n\n" + "x" * (chunk_chars * 2) + "\n\nEnd",
+    ]
+    for text in samples:
+        chunks = split_sections(text, chunk_chars)
+        assert "".join(chunks) == text
+        assert len(chunks) > 1
+        assert all(len(chunk) <= chunk_chars for chunk in chunks)
+
+
+async def timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(line_counts: list[int], ms_per_kchar: float, chunk_chars: int) -> list[dict]:
+    fake = install_fake_gemini(latency=0.2, latency_per_kchar=ms_per_kchar / 1000)
+
+    results = []
+    for lines in line_counts:
+        text = "\n".join(legal_lines(lines))
+        chunks = split_sections(text, chunk_chars)
+
+        single_ms = await timed(analyze_chunk(text))
+        calls = fake.calls
+        chunked_ms = await timed(analyze_document(text))
+
+        results.append(
+            {
+                "chars": len(text),
+                "chunks": len(chunks),
+                "llm_calls": fake.calls - calls,
+                "single_prompt_ms": round(single_ms, 1),
+                "chunked_ms": round(chunked_ms, 1),
+                "speedup": round(single_ms / chunked_ms, 2),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--ms-per-kchar", type=float, default=20.0)
+    args = parser.parse_args()
+
+    from app.services import gemini
+
+    check_split_sections(gemini.ANALYSIS_CHUNK_CHARS)
+    results = asyncio.run(run(args.lines, args.ms_per_kchar, gemini.ANALYSIS_CHUNK_CHARS))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Read latency and event-loop stalls while templates are being written.
+
+Readers fetch templates by id from the event loop, the way handlers do,
+while a writer thread keeps committing large template rows. Compared:
+blocking Session calls in the loop against AsyncSession, each with
+SQLite's default rollback journal and with the WAL pragmas applied by
+app.database.
+
+Each mode runs in a fresh process so the engine picks up its own settings.
+
+Run from the server directory:
+    python -m benchmarks.db_concurrency --reads 300 --body-kb 512
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+
+
+def _worker(mode: str, journal: str, reads: int, body_kb: int, queue):
+    import asyncio
+    import threading
+    import time
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from benchmarks.fakes import fake_embedding
+    from sqlalchemy import event
+
+    from app import database
+    from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+    from app.models import Template
+
+    if journal == "delete":
+        # Undo the WAL pragmas to reproduce the previous default
+        for target in (engine, async_engine.sync_engine):
+            event.remove(target, "connect", database._set_sqlite_pragmas)
+
+    Base.metadata.create_all(bind=engine)
+    body = "x" * (body_kb * 1024)
+    with SessionLocal() as db:
+        db.add_all(
+            Template(title=f"T{i}", body="", variables=[], tags=[],
+                     embedding=fake_embedding(str(i), 64))
+            for i in range(50)
+        )
+        db.commit()
+
+    stop = threading.Event()
+
+    def writer():
+        with SessionLocal() as db:
+            while not stop.is_set():
+                db.add(Template(title="W", body=body, variables=[], tags=[]))
+                db.commit()
+
+    async def read_sync(i):
+        with SessionLocal() as db:
+            return db.get(Template, i % 50 + 1).title
+
+    async def read_async(i):
+        async with AsyncSessionLocal() as db:
+            return (await db.get(Template, i % 50 + 1)).title
+
+    async def lag_probe(samples: list, done: asyncio.Event):
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            samples.append((time.perf_counter() - start - 0.001) * 1000)
+
+    async def run():
+        read = read_async if mode == "async" else read_sync
+        lags, done = [], asyncio.Event()
+        probe = asyncio.create_task(lag_probe(lags, done))
+
+        latencies = []
+
+        async def timed_read(i):
+            start = time.perf_counter()
+            await read(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        for batch in range(0, reads, 10):
+            await asyncio.gather(*(timed_read(i) for i in range(batch, batch + 10)))
+
+        done.set()
+        await probe
+        await async_engine.dispose()
+        return latencies, lags
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        latencies, lags = asyncio.run(run())
+    finally:
+        stop.set()
+        thread.join()
+
+    latencies.sort()
+    lags.sort()
+    queue.put(
+        {
+            "session": mode,
+            "journal": journal,
+            "read_p50_ms": round(latencies[len(latencies) // 2], 2),
+            "read_p95_ms": round(latencies[int(len(latencies) * 0.95)], 2),
+            "max_loop_stall_ms": round(lags[-1], 2) if lags else 0.0,
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=300)
+    parser.add_argument("--body-kb", type=int, default=512)
+    args = parser.parse_args()
+
+    results = []
+    for mode in ("sync", "async"):
+        for journal in ("delete", "wal"):
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=_worker, args=(mode, journal, args.reads, args.body_kb, queue)
+            )
+            process.start()
+            results.append(queue.get())
+            process.join()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
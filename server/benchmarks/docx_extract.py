@@ -0,0 +1,115 @@
+"""
+Throughput, peak memory and coverage of the streaming DOCX extractor
+against the previous python-docx path (body paragraphs only).
+
+Each extraction runs in a fresh process so peak RSS is comparable.
+
+Run from the server directory:
+    python -m benchmarks.docx_extract --paragraphs 2000 20000
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.fixtures import legal_lines
+
+
+def build_docx(path: str, paragraphs: int):
+    from docx import Document
+
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Acme Corp - Master Services Agreement"
+    doc.sections[0].footer.paragraphs[0].text = "Confidential"
+
+    for i, line in enumerate(legal_lines(paragraphs)):
+        doc.add_paragraph(line)
+        if i % 500 == 0:
+            table = doc.add_table(rows=2, cols=2)
+            table.cell(0, 0).text = "Party A"
+            table.cell(0, 1).text = "Acme Corp"
+            table.cell(1, 0).text = "Party B"
+            table.cell(1, 1).text = "Globex Ltd"
+
+    doc.save(path)
+
+
+def python_docx_paragraphs(path: str) -> str:
+    from docx import Document
+
+    doc = Document(path)
+    return "\n".join(p.text for p in doc.paragraphs)
+
+
+def streaming(path: str) -> str:
+    from app.services.parser import extract_docx
+
+    return extract_docx(path)
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+EXTRACTORS = {
+    "python_docx": python_docx_paragraphs,
+    "streaming": streaming,
+}
+
+
+def _measure(name: str, path: str, queue):
+    # Import both stacks up front so only the extraction itself is measured
+    import docx  # noqa: F401
+    import app.services.parser  # noqa: F401
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    text = EXTRACTORS[name](path)
+    elapsed = time.perf_counter() - start
+    queue.put(
+        {
+            "seconds": round(elapsed, 4),
+            "peak_rss_growth_mb": round(_peak_rss_mb() - baseline, 1),
+            "chars": len(text),
+            "has_tables": "Globex Ltd" in text,
+            "has_header_footer": "Master Services" in text and "Confidential" in text,
+        }
+    )
+
+
+def measure(name: str, path: str) -> dict:
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(name, path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[2000, 20000])
+    args = parser.parse_args()
+
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for paragraphs in args.paragraphs:
+            path = os.path.join(tmp, f"doc_{paragraphs}.docx")
+            build_docx(path, paragraphs)
+            row = {
+                "paragraphs": paragraphs,
+                "file_kb": round(os.path.getsize(path) / 1024, 1),
+            }
+            for name in EXTRACTORS:
+                row[name] = measure(name, path)
+            report.append(row)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
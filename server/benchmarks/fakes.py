@@ -0,0 +1,170 @@
+"""
+Offline stand-ins for the Gemini client so benchmarks never touch the
+network. Importing this module sets a dummy GOOGLE_API_KEY before the app
+modules are loaded; call install_fake_gemini() to swap the client.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import numpy as np
+
+from app.services import llm
+
+
+def fake_embedding(text: str, dim: int = 3072) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32).tolist()
+
+
+def _variable_keys(prompt: str) -> list[str]:
+    return list(dict.fromkeys(re.findall(r"['\"]key['\"]:\s*['\"](\w+)['\"]", prompt)))
+
+
+def fake_response_text(prompt: str, best_template_id=None) -> str:
+    """Answer each prompt in the shape the real model returns for it."""
+    if "selecting the best legal document template" in prompt:
+        return json.dumps(
+            {
+                "best_template_id": best_template_id,
+                "confidence": 0.9 if best_template_id else 0.0,
+                "reason": "offline benchmark",
+                "title": "Mutual Non-Disclosure Agreement",
+            }
+        )
+
+    if "extract explicitly stated values" in prompt:
+        keys = _variable_keys(prompt)
+        return json.dumps({keys[0]: "Acme Corp"} if keys else {})
+
+    if "Generate one clear, professional" in prompt:
+        return json.dumps(
+            {key: f"What should be used for {key}?" for key in _variable_keys(prompt)}
+        )
+
+    if "Legal Template Normalizer" in prompt:
+        return json.dumps(
+            {
+                "body": "# AGREEMENT\n\nBetween {{party_a_name}} and {{party_b_name}}.",
+                "variables": [
+                    {"key": "party_a_name", "label": "Party A", "example": ""},
+                    {"key": "party_b_name", "label": "Party B", "example": ""},
+                ],
+                "similarity_tags": ["agreement"],
+            }
+        )
+
+    if "Legal Engineer" in prompt:
+        return json.dumps(
+            {
+                "variables": [
+                    {
+                        "key": "party_a_name",
+                        "label": "Party A Name",
+                        "example": "Acme Corp",
+                        "required": True,
+                    }
+                ],
+                "similarity_tags": ["agreement"],
+            }
+        )
+
+    return "{}"
+
+
+STREAM_CHUNKS = 8
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Embeddings:
+    def __init__(self, contents, dim: int):
+        texts = contents if isinstance(contents, list) else [contents]
+        self.embeddings = [
+            SimpleNamespace(values=fake_embedding(t, dim)) for t in texts
+        ]
+
+
+class FakeGeminiClient:
+    """
+    Mimics client.models / client.aio.models. `latency` seconds are spent
+    per call (asyncio.sleep on the async surface, time.sleep on the sync one),
+    plus `latency_per_kchar` per 1000 prompt characters on generations.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        dim: int = 3072,
+        best_template_id=None,
+        latency_per_kchar: float = 0.0,
+    ):
+        self.latency = latency
+        self.latency_per_kchar = latency_per_kchar
+        self.dim = dim
+        self.best_template_id = best_template_id
+        self.calls = 0
+        self.models = SimpleNamespace(
+            generate_content=self._generate,
+            embed_content=self._embed,
+        )
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content=self._generate_async,
+                generate_content_stream=self._generate_stream_async,
+                embed_content=self._embed_async,
+            )
+        )
+
+    def _generation_latency(self, contents) -> float:
+        return self.latency + len(contents) / 1000 * self.latency_per_kchar
+
+    def _generate(self, model, contents, config=None):
+        self.calls += 1
+        time.sleep(self._generation_latency(contents))
+        return _Response(fake_response_text(contents, self.best_template_id))
+
+    def _embed(self, model, contents, config=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        return _Embeddings(contents, self.dim)
+
+    async def _generate_async(self, model, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self._generation_latency(contents))
+        return _Response(fake_response_text(contents, self.best_template_id))
+
+    async def _generate_stream_async(self, model, contents, config=None):
+        # The response arrives in STREAM_CHUNKS pieces spread over the latency
+        self.calls += 1
+        text = fake_response_text(contents, self.best_template_id)
+        step = max(len(text) // STREAM_CHUNKS, 1)
+        delay = self._generation_latency(contents) / STREAM_CHUNKS
+
+        async def chunks():
+            for start in range(0, len(text), step):
+                await asyncio.sleep(delay)
+                yield _Response(text[start : start + step])
+
+        return chunks()
+
+    async def _embed_async(self, model, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return _Embeddings(contents, self.dim)
+
+
+def install_fake_gemini(**kwargs) -> FakeGeminiClient:
+    fake = FakeGeminiClient(**kwargs)
+    llm.client = fake
+    return fake
@@ -0,0 +1,83 @@
+"""Synthetic legal documents for offline benchmarks."""
+
+import random
+
+CLAUSES = [
+    "The Receiving Party shall hold all Confidential Information in strict confidence.",
+    "This Agreement shall be governed by the laws of the State of Delaware.",
+    "Either party may terminate this Agreement upon thirty days written notice.",
+    "Payment shall be made within forty-five days of receipt of a valid invoice.",
+    "The Service Provider warrants that the services will be performed diligently.",
+    "Nothing in this Agreement creates a partnership, agency or joint venture.",
+    "Any dispute arising hereunder shall be resolved by binding arbitration.",
+    "All notices shall be in writing and delivered to the addresses set out above.",
+]
+
+
+def legal_lines(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        if i % 12 == 0:
+            lines.append(f"{i // 12 + 1}. SECTION {i // 12 + 1}")
+        else:
+            lines.append(rng.choice(CLAUSES))
+    return lines
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: list[list[str]]) -> bytes:
+    """Minimal PDF with one Helvetica text line per entry on each page."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+
+    for lines in pages:
+        ops = ["BT /F1 10 Tf 14 TL 56 760 Td"]
+        ops += [f"({_pdf_escape(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids),
+        len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
+
+
+def legal_pdf(page_count: int, lines_per_page: int = 48, seed: int = 0):
+    """Returns (pdf_bytes, source_text)."""
+    lines = legal_lines(page_count * lines_per_page, seed)
+    pages = [
+        lines[i : i + lines_per_page] for i in range(0, len(lines), lines_per_page)
+    ]
+    return build_pdf(pages), "\n".join(lines)
@@ -0,0 +1,105 @@
+"""
+Tail latency and failure rate of the web-bootstrap extraction step:
+extracting only the top search result (the previous behaviour) against
+hedged extraction over the top N results, with a fake Gemini client whose
+latency is long-tailed and which returns unusable output some of the time.
+
+Run from the server directory:
+    python -m benchmarks.hedged_extraction --trials 200 --failure-rate 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.fakes import FakeGeminiClient, _Response, fake_response_text
+from app.services import llm
+from app.services.chat import extract_template_from_web, extract_template_hedged
+
+CANDIDATES = [
+    {"title": f"Mutual NDA {i}", "raw_text": "This Agreement is made " * 100}
+    for i in range(5)
+]
+
+
+class FlakyGeminiClient(FakeGeminiClient):
+    """Lognormal latency; `failure_rate` of generations return invalid JSON."""
+
+    def __init__(self, median: float, sigma: float, failure_rate: float, seed: int = 0):
+        super().__init__()
+        self.median = median
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.cancelled = 0
+
+    async def _generate_async(self, model, contents, config=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.median * self.rng.lognormvariate(0, self.sigma))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.rng.random() < self.failure_rate:
+            return _Response("not json")
+        return _Response(fake_response_text(contents))
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def trial(fanout: int) -> tuple[float, bool]:
+    start = time.perf_counter()
+    if fanout == 0:
+        top = CANDIDATES[0]
+        result = await extract_template_from_web(top["title"], top["raw_text"])
+    else:
+        result = await extract_template_hedged(CANDIDATES, fanout=fanout)
+    return (time.perf_counter() - start) * 1000, bool(result)
+
+
+async def run(trials: int, median: float, sigma: float, failure_rate: float) -> list[dict]:
+    report = []
+    for fanout in (0, 1, 2, 3, 5):
+        client = FlakyGeminiClient(median, sigma, failure_rate)
+        llm.client = client
+
+        latencies, failures = [], 0
+        for _ in range(trials):
+            elapsed, ok = await trial(fanout)
+            latencies.append(elapsed)
+            failures += not ok
+
+        # Let cancelled attempts finish unwinding before counting them
+        await asyncio.sleep(0)
+        report.append(
+            {
+                "mode": "top_result_only" if fanout == 0 else f"hedged_fanout_{fanout}",
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "failure_rate": round(failures / trials, 3),
+                "llm_calls_per_request": round(client.calls / trials, 2),
+                "cancelled_per_request": round(client.cancelled / trials, 2),
+            }
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--median", type=float, default=0.05, help="median seconds per call")
+    parser.add_argument("--sigma", type=float, default=0.8, help="lognormal spread")
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.trials, args.median, args.sigma, args.failure_rate))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Upload response time and queue throughput for background ingestion.
+
+Compares how long a client waits for POST /ingest when the whole pipeline
+runs inside the request (the previous behaviour) against queueing the
+upload, then how long worker pools of different sizes take to drain a
+backlog of distinct documents. Uses the fake Gemini client with a fixed
+per-call latency.
+
+Run from the server directory:
+    python -m benchmarks.ingest_queue --documents 24 --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import install_fake_gemini
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+os.environ["INGEST_UPLOAD_DIR"] = os.path.join(_tmp, "uploads")
+
+from fastapi import UploadFile
+from sqlalchemy import func, select
+
+from app.database import AsyncSessionLocal, Base, async_engine, engine
+from app.models import IngestJob
+from app.services.ingest import ingest_upload
+from app.services.jobs import IngestWorkerPool, enqueue_upload
+from app.services.parser import shutdown_process_pool
+
+
+def build_docx(text: str) -> bytes:
+    from docx import Document
+
+    doc = Document()
+    doc.add_paragraph(text)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def upload(name: str, data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=name)
+
+
+async def pending_jobs() -> int:
+    async with AsyncSessionLocal() as db:
+        return (
+            await db.execute(
+                select(func.count(IngestJob.id)).where(
+                    IngestJob.status.in_(("queued", "running"))
+                )
+            )
+        ).scalar()
+
+
+async def drain(documents: list[bytes], workers: int, tag: str) -> float:
+    async with AsyncSessionLocal() as db:
+        for i, data in enumerate(documents):
+            await enqueue_upload(upload(f"{tag}-{i}.docx", data), db)
+
+    pool = IngestWorkerPool(workers, poll_seconds=0.05)
+    start = time.perf_counter()
+    pool.start()
+    while await pending_jobs():
+        await asyncio.sleep(0.02)
+    elapsed = time.perf_counter() - start
+    await pool.stop()
+    return elapsed
+
+
+async def run(documents: int, worker_counts: list[int], latency: float) -> dict:
+    install_fake_gemini(latency=latency, dim=64)
+    Base.metadata.create_all(bind=engine)
+
+    def batch(tag: str) -> list[bytes]:
+        return [
+            build_docx(f"{tag} agreement {i} between Acme Corp and Foo Ltd")
+            for i in range(documents)
+        ]
+
+    inline = []
+    async with AsyncSessionLocal() as db:
+        for i, data in enumerate(batch("inline")[:5]):
+            start = time.perf_counter()
+            await ingest_upload(upload(f"inline-{i}.docx", data), db)
+            inline.append(time.perf_counter() - start)
+
+    queued = []
+    async with AsyncSessionLocal() as db:
+        for i, data in enumerate(batch("queued")[:5]):
+            start = time.perf_counter()
+            await enqueue_upload(upload(f"queued-{i}.docx", data), db)
+            queued.append(time.perf_counter() - start)
+    # Clear the queue before timing the drains
+    await drain([], 4, "warmup")
+
+    drains = []
+    for workers in worker_counts:
+        elapsed = await drain(batch(f"w{workers}"), workers, f"w{workers}")
+        drains.append(
+            {
+                "workers": workers,
+                "drain_s": round(elapsed, 2),
+                "documents_per_s": round(documents / elapsed, 2),
+            }
+        )
+
+    shutdown_process_pool()
+    await async_engine.dispose()
+    return {
+        "llm_latency_ms": latency * 1000,
+        "inline_response_ms": round(sum(inline) / len(inline) * 1000, 1),
+        "queued_response_ms": round(sum(queued) / len(queued) * 1000, 1),
+        "documents": documents,
+        "drain": drains,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=24)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.documents, args.workers, args.latency)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Pages per second and output fidelity of the PDF extraction engines over a
+corpus of generated PDFs with known source text.
+
+Run from the server directory:
+    python -m benchmarks.pdf_engines --pages 10 50 200
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+from app.services.parser import PDF_ENGINES, extract_pdf_pages
+from benchmarks.fixtures import legal_pdf
+
+
+def word_f1(extracted: str, source: str) -> float:
+    """Bag-of-words F1 between extracted and source text (1.0 = identical)."""
+    got, want = Counter(extracted.split()), Counter(source.split())
+    overlap = sum((got & want).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(got.values())
+    recall = overlap / sum(want.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def run(page_counts: list[int], repeat: int) -> dict:
+    report = {"engines": {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = []
+        for pages in page_counts:
+            pdf_bytes, source = legal_pdf(pages, seed=pages)
+            path = os.path.join(tmp, f"doc_{pages}.pdf")
+            with open(path, "wb") as f:
+                f.write(pdf_bytes)
+            corpus.append((path, pages, source))
+
+        for engine in PDF_ENGINES:
+            rows = []
+            for path, pages, source in corpus:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    text = extract_pdf_pages(path, 0, pages, engine)
+                elapsed = (time.perf_counter() - start) / repeat
+                rows.append(
+                    {
+                        "pages": pages,
+                        "pages_per_s": round(pages / elapsed, 1),
+                        "fidelity": round(word_f1(text, source), 4),
+                    }
+                )
+            report["engines"][engine] = rows
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.pages, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
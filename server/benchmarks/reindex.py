@@ -0,0 +1,96 @@
+"""
+Re-embedding a template library: one embedding request per template, one
+after another (how seeding used to work), against reindex_templates'
+batched concurrent requests, and a second re-index run where nothing
+changed. Uses the fake Gemini client with a fixed per-request latency.
+
+Run from the server directory:
+    python -m benchmarks.reindex --templates 2000 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import install_fake_gemini
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from app.database import Base, SessionLocal, engine
+from app.models import Template
+from app.reindex import reindex_templates
+from app.services.gemini import embed_text_async, template_embedding_text
+
+
+def populate(count: int):
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add_all(
+            Template(
+                title=f"Template {i}",
+                body="",
+                variables=[],
+                tags=["agreement", f"tag{i % 50}"],
+            )
+            for i in range(count)
+        )
+        db.commit()
+
+
+async def one_by_one(db, sample: int) -> float:
+    rows = db.query(Template.title, Template.tags).limit(sample).all()
+    start = time.perf_counter()
+    for row in rows:
+        await embed_text_async(template_embedding_text(row.title, row.tags))
+    return (time.perf_counter() - start) / len(rows)
+
+
+async def run(count: int, latency: float, sample: int) -> dict:
+    fake = install_fake_gemini(latency=latency, dim=768)
+    populate(count)
+
+    with SessionLocal() as db:
+        per_row = await one_by_one(db, min(sample, count))
+
+        calls = fake.calls
+        start = time.perf_counter()
+        first = await reindex_templates(db)
+        first_s = time.perf_counter() - start
+        first_calls = fake.calls - calls
+
+        calls = fake.calls
+        start = time.perf_counter()
+        second = await reindex_templates(db)
+        second_s = time.perf_counter() - start
+
+    return {
+        "templates": count,
+        "latency_ms_per_request": latency * 1000,
+        "one_by_one_s_estimated": round(per_row * count, 1),
+        "batched_s": round(first_s, 2),
+        "batched_requests": first_calls,
+        "speedup": round(per_row * count / first_s, 1),
+        "unchanged_rerun_s": round(second_s, 2),
+        "unchanged_rerun_requests": fake.calls - calls,
+        "rerun_stats": second,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--templates", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument(
+        "--sample", type=int, default=50, help="rows timed one by one to estimate the old cost"
+    )
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.templates, args.latency, args.sample)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Latency of the start-draft LLM stages with a fake Gemini client of fixed
+per-call latency: the old strictly sequential order against the current
+pipeline, for the matched-template path (with and without persisted
+questions) and the web-bootstrap path.
+
+Run from the server directory:
+    python -m benchmarks.start_draft_latency --latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import install_fake_gemini
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from app.database import AsyncSessionLocal, Base, async_engine, engine
+from app.services.chat import (
+    create_template,
+    generate_friendly_questions,
+    prefill_and_generate_questions,
+    prefill_and_load_questions,
+    prefill_variables_from_query,
+)
+from app.seed_templates import SEED_TEMPLATES
+
+QUERY = "Draft a mutual NDA for Acme Corp"
+VARIABLES = SEED_TEMPLATES[0]["variables"]
+ANALYSIS = {"variables": VARIABLES, "similarity_tags": ["nda"]}
+
+
+async def sequential_matched():
+    prefilled = await prefill_variables_from_query(QUERY, VARIABLES)
+    missing = [v for v in VARIABLES if v["key"] not in prefilled]
+    await generate_friendly_questions(missing)
+
+
+async def concurrent_matched():
+    await prefill_and_generate_questions(QUERY, VARIABLES)
+
+
+async def persisted_matched(template, db):
+    await prefill_and_load_questions(QUERY, template, db)
+
+
+async def sequential_bootstrap(db):
+    await create_template("Bench NDA", "body", ANALYSIS, db)
+    await sequential_matched()
+
+
+async def concurrent_bootstrap(db):
+    await asyncio.gather(
+        create_template("Bench NDA", "body", ANALYSIS, db),
+        prefill_variables_from_query(QUERY, VARIABLES),
+    )
+
+
+async def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def run(latency: float, repeat: int) -> dict:
+    fake = install_fake_gemini(latency=latency, dim=64)
+    Base.metadata.create_all(bind=engine)
+
+    async with AsyncSessionLocal() as db:
+        template = await create_template("Bench NDA", "body", ANALYSIS, db)
+
+        stages = {
+            "matched": (sequential_matched, concurrent_matched),
+            "matched_persisted_questions": (
+                sequential_matched,
+                lambda: persisted_matched(template, db),
+            ),
+            "bootstrap": (
+                lambda: sequential_bootstrap(db),
+                lambda: concurrent_bootstrap(db),
+            ),
+        }
+
+        report = {"llm_latency_ms": latency * 1000, "paths": {}}
+        for name, (sequential, concurrent) in stages.items():
+            calls = fake.calls
+            before = await timed(sequential, repeat)
+            before_calls, calls = (fake.calls - calls) / repeat, fake.calls
+            after = await timed(concurrent, repeat)
+            after_calls = (fake.calls - calls) / repeat
+            report["paths"][name] = {
+                "sequential_ms": round(before, 1),
+                "concurrent_ms": round(after, 1),
+                "reduction_pct": round((1 - after / before) * 100, 1),
+                "sequential_llm_calls": before_calls,
+                "concurrent_llm_calls": after_calls,
+            }
+
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per LLM call")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.latency, args.repeat)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Perceived latency of /start-draft/stream against /start-draft: when each
+event (matched template, prefilled values, first question, final payload)
+reaches the client, compared with the single JSON response. Covers a
+matched template whose questions still have to be generated and one with
+persisted questions. Uses the fake Gemini client, which streams each
+response in a few chunks spread over its latency.
+
+Run from the server directory:
+    python -m benchmarks.start_draft_stream --latency 0.5 --latency-per-kchar 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import install_fake_gemini
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from sqlalchemy import update
+
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.main import DraftRequest, start_draft
+from app.models import Template
+from app.seed_templates import SEED_TEMPLATES
+from app.services.chat import create_template
+from app.services.draft import stream_draft
+from app.services.index import template_index
+
+QUERY = "Draft a mutual NDA for Acme Corp"
+SEED = SEED_TEMPLATES[0]
+
+
+async def clear_questions():
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Template).values(questions=None, questions_hash=None))
+        await db.commit()
+
+
+async def json_ms() -> float:
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await start_draft(DraftRequest(query=QUERY), db)
+    return (time.perf_counter() - start) * 1000
+
+
+async def stream_ms() -> dict:
+    start = time.perf_counter()
+    arrivals = {}
+    async for event in stream_draft(QUERY):
+        name = event.split("\n", 1)[0].removeprefix("event: ")
+        if name == "error":
+            raise RuntimeError(event)
+        arrivals.setdefault(name, (time.perf_counter() - start) * 1000)
+    return arrivals
+
+
+async def run(latency: float, latency_per_kchar: float, repeat: int) -> dict:
+    install_fake_gemini(latency=latency, latency_per_kchar=latency_per_kchar, dim=64, best_template_id=1)
+    Base.metadata.create_all(bind=engine)
+
+    async with AsyncSessionLocal() as db:
+        await create_template(
+            SEED["title"],
+            SEED["body_md"],
+            {"variables": SEED["variables"], "similarity_tags": SEED["tags"]},
+            db,
+        )
+    with SessionLocal() as db:
+        template_index.load(db)
+
+    report = {
+        "llm_latency_ms": latency * 1000,
+        "variables": len(SEED["variables"]),
+        "paths": {},
+    }
+    for path, persisted in (("generated_questions", False), ("persisted_questions", True)):
+        totals, streams = [], []
+        for _ in range(repeat):
+            if not persisted:
+                await clear_questions()
+            totals.append(await json_ms())
+            if not persisted:
+                await clear_questions()
+            streams.append(await stream_ms())
+
+        def mean(values):
+            return round(sum(values) / len(values), 1)
+
+        report["paths"][path] = {
+            "json_response_ms": mean(totals),
+            "stream_first_event_ms": mean([s["stage"] for s in streams]),
+            "stream_template_ms": mean([s["template"] for s in streams]),
+            "stream_prefilled_ms": mean([s["prefilled"] for s in streams]),
+            "stream_first_question_ms": mean([s["question"] for s in streams]),
+            "stream_done_ms": mean([s["done"] for s in streams]),
+        }
+
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per LLM call")
+    parser.add_argument(
+        "--latency-per-kchar",
+        type=float,
+        default=0.3,
+        help="extra generation seconds per 1000 prompt characters",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        json.dumps(
+            asyncio.run(run(args.latency, args.latency_per_kchar, args.repeat)),
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Offline benchmark suite for the server's hot paths, meant to be run on
+every commit so regressions show up as numbers rather than complaints:
+
+  scoring      cosine_similarity, TemplateIndex.search and find_best_template
+               over synthetic libraries (1k, 10k and 100k templates)
+  templatize   create_template's substitution, and create_template itself
+  render       /finish-draft rendering of a long template, cold and cached
+  extract      extract_text_from_file on generated PDF and DOCX uploads
+  update       update_existing_templates over a template library
+
+Gemini is replaced by benchmarks.fakes with zero latency and Exa by the
+local stand-in server, and outbound connections other than loopback are
+refused, so the suite never touches the network and only measures local
+work. Results are printed as JSON (app logging goes to stderr); with
+--baseline, cases whose median got slower than --threshold exit non-zero.
+
+Run from the server directory:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --baseline bench.json --threshold 0.25
+"""
+
+import argparse
+import asyncio
+import io
+import ipaddress
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+os.environ.pop("EMBED_CACHE_PATH", None)
+os.environ.pop("WEB_SEARCH_CACHE_PATH", None)
+
+# App modules log with print(); keep stdout for the JSON report
+with redirect_stdout(sys.stderr):
+    from benchmarks.fakes import install_fake_gemini
+    from benchmarks.web_search import start_stand_in
+
+    import numpy as np
+    from fastapi import UploadFile
+    from sqlalchemy import update
+
+    from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+    from app.models import Template
+    from app.services.chat import cosine_similarity, create_template, find_best_template
+    from app.services.index import TemplateIndex
+    from app.services.parser import extract_text_from_file, shutdown_process_pool
+    from app.services.render import compile_body, get_compiled, render_compiled
+    from app.services.templatize import Templatizer
+    from app.services.update import update_existing_templates
+    from benchmarks.ann_recall import synthetic_library
+    from benchmarks.docx_extract import build_docx
+    from benchmarks.fixtures import legal_lines, legal_pdf
+    from benchmarks.templatize import make_document, make_variables
+
+
+def forbid_network():
+    """Refuse any connection that isn't to the local machine."""
+    connect = socket.socket.connect
+
+    def guarded(sock, address):
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            host = address[0]
+            try:
+                local = ipaddress.ip_address(host).is_loopback
+            except ValueError:
+                local = host == "localhost"
+            if not local:
+                raise ConnectionRefusedError(f"benchmark suite is offline: {host}")
+        return connect(sock, address)
+
+    socket.socket.connect = guarded
+
+
+def summarize(samples: list[float], **extra) -> dict:
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "median_ms": round(samples[len(samples) // 2] * 1000, 4),
+        "min_ms": round(samples[0] * 1000, 4),
+        "p95_ms": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000, 4),
+        **extra,
+    }
+
+
+def measure(fn, repeat: int, setup=None, **extra) -> dict:
+    samples = []
+    for _ in range(repeat + 1):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    # The first run only warms caches and imports
+    return summarize(samples[1:], **extra)
+
+
+async def measure_async(fn, repeat: int, **extra) -> dict:
+    samples = []
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        await fn(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples[1:], **extra)
+
+
+async def bench_scoring(sizes: list[int], dim: int, repeat: int, cosine_rows: int) -> dict:
+    results = {}
+    queries = synthetic_library(repeat + 1, dim, 8, seed=1)
+
+    for size in sizes:
+        matrix = synthetic_library(size, dim, max(size // 500, 1))
+        index = TemplateIndex()
+        ids = list(range(1, size + 1))
+        index.set_rows(ids, [{"title": f"Template {i}", "tags": ["agreement"]} for i in ids], matrix)
+
+        # The pure-Python scan is timed over a slice and scaled up, since a
+        # full pass over 100k rows takes minutes
+        rows = [row.tolist() for row in matrix[: min(size, cosine_rows)]]
+        query = queries[0].tolist()
+
+        def cosine_scan():
+            for row in rows:
+                cosine_similarity(query, row)
+
+        scan = measure(cosine_scan, repeat)
+        scale = size / len(rows)
+        results[f"scoring.cosine_similarity.{size}"] = {
+            **scan,
+            "median_ms": round(scan["median_ms"] * scale, 4),
+            "min_ms": round(scan["min_ms"] * scale, 4),
+            "p95_ms": round(scan["p95_ms"] * scale, 4),
+            "sampled_rows": len(rows),
+        }
+
+        search_queries = iter(queries.tolist() * 2)
+        results[f"scoring.index_search.{size}"] = measure(
+            lambda: index.search(next(search_queries), k=3), repeat
+        )
+
+        # Distinct queries, so every call embeds (fake) instead of hitting the cache
+        results[f"scoring.find_best_template.{size}"] = await measure_async(
+            lambda i: find_best_template(f"Draft agreement {size}-{i}", index), repeat
+        )
+
+    return results
+
+
+async def bench_templatize(repeat: int) -> dict:
+    variables = make_variables(50)
+    document = make_document(2000, variables)
+    templatizer = Templatizer(variables)
+
+    results = {
+        "templatize.substitute.50_vars_2000_lines": measure(
+            lambda: templatizer.apply(document), repeat, chars=len(document)
+        )
+    }
+
+    analysis = {"variables": variables, "similarity_tags": ["agreement"]}
+
+    async def create(i):
+        async with AsyncSessionLocal() as db:
+            await create_template(f"Benchmark {i}", document, analysis, db)
+
+    results["templatize.create_template.50_vars_2000_lines"] = await measure_async(
+        create, repeat
+    )
+    return results
+
+
+def bench_render(repeat: int) -> dict:
+    keys = [f"var_{i}" for i in range(50)]
+    lines = legal_lines(20000)
+    body = "\n".join(
+        f"{line} {{{{{keys[i % len(keys)]}}}}}" if i % 3 == 0 else line
+        for i, line in enumerate(lines)
+    )
+    template = Template(id=1, version=1, body=body, variables=[])
+    answers = {key: f"Value {key}" for key in keys}
+
+    return {
+        "render.compile_and_render.20000_lines": measure(
+            lambda: render_compiled(compile_body(body), answers), repeat, chars=len(body)
+        ),
+        "render.cached.20000_lines": measure(
+            lambda: render_compiled(get_compiled(template), answers), repeat
+        ),
+    }
+
+
+async def bench_extract(repeat: int, pdf_pages: int, docx_paragraphs: int) -> dict:
+    pdf_bytes, _ = legal_pdf(pdf_pages)
+    docx_path = os.path.join(_tmp, "bench.docx")
+    build_docx(docx_path, docx_paragraphs)
+    with open(docx_path, "rb") as f:
+        docx_bytes = f.read()
+
+    async def extract(name: str, data: bytes):
+        await extract_text_from_file(UploadFile(io.BytesIO(data), filename=name))
+
+    results = {
+        f"extract.pdf.{pdf_pages}_pages": await measure_async(
+            lambda i: extract("bench.pdf", pdf_bytes), repeat
+        ),
+        f"extract.docx.{docx_paragraphs}_paragraphs": await measure_async(
+            lambda i: extract("bench.docx", docx_bytes), repeat
+        ),
+    }
+    shutdown_process_pool()
+    return results
+
+
+def bench_update(repeat: int, templates: int) -> dict:
+    variables = [
+        {"key": "disclosing_party_name", "example": "Acme Corp"},
+        {"key": "receiving_party_name", "example": "Globex Ltd"},
+    ]
+    signatures = "\n\nDisclosing Party Name: Acme Corp\nReceiving Party Name: Globex Ltd\n"
+    body = "\n".join(legal_lines(200)) + signatures
+
+    with SessionLocal() as db:
+        db.add_all(
+            Template(title=f"Update {i}", body=body, variables=variables, tags=[])
+            for i in range(templates)
+        )
+        db.commit()
+
+    def reset():
+        with SessionLocal() as db:
+            db.execute(
+                update(Template)
+                .where(Template.title.like("Update %"))
+                .values(body=body)
+            )
+            db.commit()
+
+    return {
+        f"update.update_existing_templates.{templates}_templates": measure(
+            update_existing_templates, repeat, setup=reset
+        ),
+    }
+
+
+async def run(args) -> dict:
+    install_fake_gemini(dim=args.dim)
+    exa = start_stand_in(0, 0)
+    Base.metadata.create_all(bind=engine)
+
+    results = {}
+    try:
+        results.update(await bench_scoring(args.sizes, args.dim, args.repeat, args.cosine_rows))
+        results.update(await bench_templatize(args.repeat))
+        results.update(bench_render(args.repeat))
+        results.update(await bench_extract(args.repeat, args.pdf_pages, args.docx_paragraphs))
+        results.update(bench_update(args.repeat, args.update_templates))
+    finally:
+        exa.shutdown()
+        await async_engine.dispose()
+
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[dict]:
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get("median_ms"):
+            continue
+        ratio = current["median_ms"] / before["median_ms"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                {
+                    "case": name,
+                    "baseline_ms": before["median_ms"],
+                    "current_ms": current["median_ms"],
+                    "ratio": round(ratio, 2),
+                }
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=768, help="embedding dimension")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--cosine-rows", type=int, default=2000, help="rows the Python cosine scan is timed on"
+    )
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--docx-paragraphs", type=int, default=2000)
+    parser.add_argument("--update-templates", type=int, default=500)
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="report from an earlier run to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed median slowdown, 0.25 = 25%%"
+    )
+    args = parser.parse_args()
+
+    forbid_network()
+    with redirect_stdout(sys.stderr):
+        results = asyncio.run(run(args))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "dim": args.dim,
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if regressions:
+        for r in regressions:
+            print(
+                f"Regression: {r['case']} {r['baseline_ms']} ms -> {r['current_ms']} ms",
+                file=sys.stderr,
+            )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Web search latency against a local stand-in for the Exa API: a fresh
+httpx client per call (the previous behaviour) against the pooled client,
+and the pooled client with the result cache on repeat queries, for both
+"found" and "no template found" answers.
+
+The stand-in sleeps `--handshake-ms` on every new connection to stand in
+for TCP+TLS setup, and `--response-ms` on every request. Before timing,
+check_behaviour() asserts the result shape, cache hits, the short-lived
+"not found" entry and that upstream errors are raised rather than cached.
+
+Run from the server directory:
+    python -m benchmarks.web_search --handshake-ms 150 --response-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("EXA_API_KEY", "offline-benchmark")
+
+import httpx
+
+
+class StandInExa(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    handshake_s = 0.0
+    response_s = 0.0
+    connections = 0
+    requests = 0
+    # Requests answered with 503 before serving normally again
+    failures = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+        time.sleep(self.handshake_s)
+
+    def do_POST(self):
+        type(self).requests += 1
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.response_s)
+
+        if type(self).failures > 0:
+            type(self).failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        results = []
+        if "missing" not in payload["query"]:
+            results = [
+                {"title": f"Result {i}", "text": "This Agreement is made " * 200}
+                for i in range(5)
+            ] + [{"title": "Blank page", "text": "  "}]
+        body = json.dumps({"results": results}).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in(handshake_ms: float, response_ms: float) -> ThreadingHTTPServer:
+    StandInExa.handshake_s = handshake_ms / 1000
+    StandInExa.response_s = response_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInExa)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["EXA_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    return server
+
+
+async def unpooled_search(query: str):
+    from app.services.web_search import EXA_BASE_URL
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        response = await client.post(
+            f"{EXA_BASE_URL}/search",
+            json={"query": f"{query} legal document example", "numResults": 5},
+            headers={"x-api-key": "offline-benchmark"},
+        )
+        response.raise_for_status()
+    return response.json()
+
+
+async def measure(fn, queries: list[str]) -> dict:
+    connections, requests = StandInExa.connections, StandInExa.requests
+    start = time.perf_counter()
+    for query in queries:
+        await fn(query)
+    elapsed = (time.perf_counter() - start) / len(queries) * 1000
+    return {
+        "mean_ms": round(elapsed, 1),
+        "connections": StandInExa.connections - connections,
+        "upstream_requests": StandInExa.requests - requests,
+    }
+
+
+async def check_behaviour():
+    from app.services import web_search
+
+    cache = web_search.web_search_cache
+    cache.clear()
+    StandInExa.failures = 0
+
+    def upstream_calls(before: int) -> int:
+        return StandInExa.requests - before
+
+    try:
+        # Result shape: text-less results dropped, text cut to 3000 chars
+        before = StandInExa.requests
+        found = await web_search.search_template_on_web("Mutual NDA")
+        assert upstream_calls(before) == 1
+        assert len(found) == 5, found
+        for candidate in found:
+            assert set(candidate) == {"title", "raw_text"}, candidate
+            assert candidate["raw_text"].startswith("This Agreement is made")
+            assert len(candidate["raw_text"]) <= 3000
+
+        # Normalized repeats are served from the cache
+        hits = cache.stats()["hits"]
+        again = await web_search.search_template_on_web("  mutual nda!  ")
+        assert again == found
+        assert upstream_calls(before) == 1
+        assert cache.stats()["hits"] == hits + 1
+
+        # Upstream errors raise and aren't cached, so a retry goes upstream
+        StandInExa.failures = 1
+        before = StandInExa.requests
+        try:
+            await web_search.search_template_on_web("Lease agreement")
+        except RuntimeError as e:
+            assert "Web search failed" in str(e)
+        else:
+            raise AssertionError("a 503 from the search API should raise")
+        retried = await web_search.search_template_on_web("Lease agreement")
+        assert len(retried) == 5
+        assert upstream_calls(before) == 2
+
+        # "Nothing found" is cached, but only for WEB_SEARCH_NEGATIVE_TTL
+        negative_ttl = web_search.WEB_SEARCH_NEGATIVE_TTL
+        web_search.WEB_SEARCH_NEGATIVE_TTL = 0.2
+        try:
+            before = StandInExa.requests
+            assert await web_search.search_template_on_web("missing deed") == []
+            assert await web_search.search_template_on_web("missing deed") == []
+            assert upstream_calls(before) == 1
+            await asyncio.sleep(0.3)
+            assert await web_search.search_template_on_web("missing deed") == []
+            assert upstream_calls(before) == 2
+        finally:
+            web_search.WEB_SEARCH_NEGATIVE_TTL = negative_ttl
+    finally:
+        StandInExa.failures = 0
+        cache.clear()
+        # Keep the checks out of the hit rate the report prints
+        cache.hits = cache.disk_hits = cache.misses = 0
+        await web_search.close_http_client()
+
+
+async def run(repeat: int) -> dict:
+    from app.services import web_search
+
+    await check_behaviour()
+
+    async def pooled_uncached(query: str):
+        web_search.web_search_cache.clear()
+        return await web_search.search_template_on_web(query)
+
+    report = {}
+    try:
+        for label, query in (("found", "Mutual NDA"), ("not_found", "missing deed")):
+            queries = [query] * repeat
+            report[label] = {
+                "new_client_per_call": await measure(unpooled_search, queries),
+                "pooled": await measure(pooled_uncached, queries),
+            }
+            # First lookup misses, the rest are served from the cache
+            web_search.web_search_cache.clear()
+            report[label]["pooled_cached"] = await measure(
+                web_search.search_template_on_web, queries
+            )
+    finally:
+        await web_search.close_http_client()
+
+    report["cache"] = web_search.web_search_cache.stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--response-ms", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    server = start_stand_in(args.handshake_ms, args.response_ms)
+    try:
+        print(json.dumps(asyncio.run(run(args.repeat)), indent=2))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()